@@ -0,0 +1,124 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import (
+    JWTAuthentication, JWTStatelessUserAuthentication,
+)
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+# User fields signed into tokens, read back by TokenUser
+TOKEN_USER_CLAIMS = ('username', 'is_staff')
+PUBLIC_PROFILE = 'public'
+
+
+def add_token_user_claims(token, user):
+    """Sign the fields read by TokenUser into the token."""
+    for claim in TOKEN_USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def cached_user_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    """Drop the cached user, again once the transaction commits."""
+    key = cached_user_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+@lru_cache(maxsize=None)
+def get_authentication_classes(profile):
+    """Authentication classes of an AUTHENTICATION_PROFILES entry."""
+    return tuple(import_string(path)
+                 for path in settings.AUTHENTICATION_PROFILES[profile])
+
+
+@receiver(setting_changed)
+def reset_authentication_classes(setting, **kwargs):
+    if setting == 'AUTHENTICATION_PROFILES':
+        get_authentication_classes.cache_clear()
+
+
+class AuthenticationProfileMixin:
+    """Authenticate with the classes of `authentication_profile`.
+
+    Views of the public profile authenticate lazily, so reads which
+    never look at `request.user` skip authentication entirely. Unsafe
+    methods use `unsafe_authentication_profile` when it is set, e.g. to
+    check that the user is still active before writes.
+    """
+    authentication_profile = None
+    unsafe_authentication_profile = None
+
+    def get_authentication_profile(self):
+        method = getattr(getattr(self, 'request', None), 'method', None)
+        if (self.unsafe_authentication_profile is not None and
+                method not in SAFE_METHODS):
+            return self.unsafe_authentication_profile
+        return self.authentication_profile
+
+    def get_authenticators(self):
+        profile = self.get_authentication_profile()
+        if profile is None:
+            return super().get_authenticators()
+        return [authentication() for authentication
+                in get_authentication_classes(profile)]
+
+    def perform_authentication(self, request):
+        if (self.authentication_profile == PUBLIC_PROFILE and
+                request.method in SAFE_METHODS):
+            return
+        super().perform_authentication(request)
+
+
+class TokenUserAuthentication(JWTStatelessUserAuthentication):
+    """JWT authentication without a user query.
+
+    `request.user` is a TokenUser built from the signed claims, for reads
+    which only need the id of the user. The claims are trusted until the
+    token expires, so deactivated users are not rejected: writes should
+    use a profile which loads the user.
+    """
+
+
+class CachedUserJWTAuthentication(JWTAuthentication):
+    """JWT authentication with users loaded from a short-lived cache.
+
+    Saving or deleting a user drops its cached copy, so deactivated
+    users are rejected on their next request.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+
+        key = cached_user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+
+class TokenUserJWTScheme(SimpleJWTScheme):
+    target_class = 'MarketPlace.core.authentication.TokenUserAuthentication'
+
+
+class CachedUserJWTScheme(SimpleJWTScheme):
+    target_class = (
+        'MarketPlace.core.authentication.CachedUserJWTAuthentication')
@@ -0,0 +1,293 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetMixin:
+    """Keyset helpers shared by the keyset paginations.
+
+    A keyset is the ordering of a page as field attnames, `-` prefixed
+    when descending, which ends with the primary key. Cursors hold the
+    values of every key of the last row, so the next page starts exactly
+    after it whatever the ordering.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def after(keyset, position):
+        """Rows after `position` in the order of `keyset`."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(keyset, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def get_model_field(model, name):
+        """Model field of a keyset or ordering entry."""
+        name = name.lstrip('-')
+        if name == 'pk':
+            return model._meta.pk
+        return model._meta.get_field(name)
+
+    def get_keyset(self, model, ordering):
+        """Keyset of `ordering`, with the primary key appended.
+
+        Raises FieldDoesNotExist for entries which are not concrete,
+        non-null fields of `model`, such as annotations, lookups across
+        relations or nullable columns.
+        """
+        keyset = []
+        for entry in ordering:
+            if not isinstance(entry, str):
+                raise FieldDoesNotExist(f'{entry} is not a field.')
+            field = self.get_model_field(model, entry)
+            if (not field.concrete or field.many_to_many or
+                    field.null or '__' in entry):
+                raise FieldDoesNotExist(f'{entry} can not be a keyset.')
+            prefix = '-' if entry.startswith('-') else ''
+            keyset.append(prefix + field.attname)
+        if not any(field.lstrip('-') == model._meta.pk.attname
+                   for field in keyset):
+            keyset.append(f'-{model._meta.pk.attname}')
+        return keyset
+
+    def position(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.keyset]
+
+    def encode_keyset_cursor(self, position, reverse=False):
+        cursor = json.dumps([position, reverse], default=str)
+        return urlsafe_b64encode(cursor.encode()).decode()
+
+    def decode_keyset_cursor(self, request, model):
+        """`(position, reverse)` of the cursor of the request."""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            position, reverse = json.loads(urlsafe_b64decode(cursor.encode()))
+            fields = [self.get_model_field(model, field)
+                      for field in self.keyset]
+            if len(position) != len(fields):
+                raise ValueError('Cursor does not match the ordering.')
+            position = [field.to_python(value)
+                        for field, value in zip(fields, position)]
+        except (TypeError, ValueError, ValidationError, FieldDoesNotExist):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(reverse)
+
+
+class KeysetPageNumberPagination(KeysetMixin, PageNumberPagination):
+    """Page number pagination with a keyset mode for infinite scrolling.
+
+    `?pagination=cursor` switches to keyset pagination on the ordering of
+    the queryset, `-keyset_field` when it has none: pages are fetched
+    with an index range scan instead of `COUNT(*)` plus `OFFSET`, and the
+    response only links the next page through an opaque `cursor`.
+    Orderings which can not be keyset paginated, such as the search rank,
+    are rejected with 400 rather than replaced.
+    `?count=false` keeps page numbers but skips the `COUNT(*)` query.
+    """
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+    keyset_field = 'created_at'
+    invalid_ordering_message = (
+        'Cursor pagination is not available for this ordering.')
+
+    PAGE_MODE = 'page'
+    OFFSET_MODE = 'offset'
+    KEYSET_MODE = 'keyset'
+
+    def get_mode(self, request):
+        params = request.query_params
+        if (params.get(self.mode_query_param) == 'cursor' or
+                self.cursor_query_param in params):
+            return self.KEYSET_MODE
+        if params.get(self.count_query_param, '').lower() in ('0', 'false'):
+            return self.OFFSET_MODE
+        return self.PAGE_MODE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.mode = self.get_mode(request)
+        if self.mode == self.PAGE_MODE:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if self.mode == self.KEYSET_MODE:
+            results = self.paginate_keyset(queryset, request, page_size)
+        else:
+            results = self.paginate_offset(queryset, request, page_size)
+
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+        if self.has_next and self.mode == self.KEYSET_MODE:
+            self.next_position = self.position(results[-1])
+        return results
+
+    def get_ordering(self, queryset):
+        query = queryset.query
+        if query.order_by:
+            return query.order_by
+        if query.default_ordering and queryset.model._meta.ordering:
+            return queryset.model._meta.ordering
+        return (f'-{self.keyset_field}',)
+
+    def paginate_keyset(self, queryset, request, page_size):
+        try:
+            self.keyset = self.get_keyset(
+                queryset.model, self.get_ordering(queryset))
+        except FieldDoesNotExist:
+            raise DRFValidationError(
+                {self.mode_query_param: self.invalid_ordering_message})
+
+        queryset = queryset.order_by(*self.keyset)
+        position, _ = self.decode_keyset_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.after(self.keyset, position))
+        return list(queryset[:page_size + 1])
+
+    def paginate_offset(self, queryset, request, page_size):
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1))
+            if self.page_number < 1:
+                raise ValueError('That page number is less than 1')
+        except ValueError as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params[self.page_query_param],
+                message=str(exc)))
+
+        offset = (self.page_number - 1) * page_size
+        return list(queryset[offset:offset + page_size + 1])
+
+    def get_next_link(self):
+        if self.mode == self.PAGE_MODE:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        if self.mode == self.KEYSET_MODE:
+            return replace_query_param(
+                url, self.cursor_query_param,
+                self.encode_keyset_cursor(self.next_position))
+        return replace_query_param(
+            url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.mode == self.PAGE_MODE:
+            return super().get_previous_link()
+        if self.mode == self.KEYSET_MODE or self.page_number == 1:
+            return None
+
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.mode == self.PAGE_MODE:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters += [{
+            'name': self.mode_query_param, 'required': False, 'in': 'query',
+            'description': 'Set to "cursor" for keyset pagination.',
+            'schema': {'type': 'string', 'enum': ['cursor']},
+        }, {
+            'name': self.cursor_query_param, 'required': False,
+            'in': 'query',
+            'description': 'Position of the next page in keyset pagination.',
+            'schema': {'type': 'string'},
+        }, {
+            'name': self.count_query_param, 'required': False, 'in': 'query',
+            'description': 'Set to false to skip the total count.',
+            'schema': {'type': 'boolean'},
+        }]
+        return parameters
+
+
+class KeysetCursorPagination(KeysetMixin, CursorPagination):
+    """Cursor pagination on the whole ordering plus `tiebreak_ordering`.
+
+    DRF's cursor pagination positions pages on the first ordering field
+    and an offset, which is capped at `offset_cutoff`, so orderings on
+    fields with few distinct values repeat pages forever. Here cursors
+    hold the values of every key of the ordering, which ends with the
+    primary key, so each page starts exactly after the previous one.
+    """
+    tiebreak_ordering = ('-pk',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        ordering = list(self.get_ordering(request, queryset, view))
+        names = {field.lstrip('-') for field in ordering}
+        ordering += [field for field in self.tiebreak_ordering
+                     if field.lstrip('-') not in names]
+        self.keyset = self.get_keyset(queryset.model, ordering)
+        position, self.reverse = self.decode_keyset_cursor(
+            request, queryset.model)
+
+        keyset = self.keyset
+        if self.reverse:
+            keyset = [self.invert(field) for field in keyset]
+        queryset = queryset.order_by(*keyset)
+        if position is not None:
+            queryset = queryset.filter(self.after(keyset, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.first_position = self.last_position = None
+        if results:
+            self.first_position = self.position(results[0])
+            self.last_position = self.position(results[-1])
+        self.has_next = has_more if not self.reverse else position is not None
+        self.has_previous = has_more if self.reverse else position is not None
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            self.encode_keyset_cursor(self.last_position, False))
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            self.encode_keyset_cursor(self.first_position, True))
@@ -34,6 +34,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
 
     # additional
     "debug_toolbar",
@@ -110,6 +111,20 @@ DATABASES = {
     }
 }
 
+# Cache
+# Any Django cache backend, e.g. django.core.cache.backends.redis.RedisCache.
+# Run several processes with a shared backend: cache versions and
+# invalidations made by one process must reach the others.
+
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -168,6 +183,24 @@ REST_FRAMEWORK = {
 
 }
 
+# Authentication classes of views by their `authentication_profile`,
+# views without one use DEFAULT_AUTHENTICATION_CLASSES
+AUTHENTICATION_PROFILES = {
+    # Catalog, reads skip authentication and writes use JWT
+    'public': (
+        'MarketPlace.core.authentication.CachedUserJWTAuthentication',
+    ),
+    # JWT with a user built from the token claims, without a query,
+    # for reads only as it does not check that the user is active
+    'token_user': (
+        'MarketPlace.core.authentication.TokenUserAuthentication',
+    ),
+    # JWT with the full user from a short-lived cache
+    'api': (
+        'MarketPlace.core.authentication.CachedUserJWTAuthentication',
+    ),
+}
+
 AUTHENTICATION_BACKENDS = (
     # Facebook OAuth2
     'social_core.backends.facebook.FacebookAppOAuth2',
@@ -209,6 +242,17 @@ SPECTACULAR_SETTINGS = {
     'SCHEMA_PATH_PREFIX': r'/api/',
 }
 
+# Product facet snapshot of a category page, in seconds
+PRODUCT_FACETS_CACHE_TIMEOUT = 60 * 5
+# Serialized product detail, in seconds
+PRODUCT_DETAIL_CACHE_TIMEOUT = 60 * 15
+# Categories, brands and attribute values, in seconds
+REFERENCE_DATA_CACHE_TIMEOUT = 60 * 60 * 24
+# Client and CDN max-age of reference data responses, in seconds
+REFERENCE_DATA_MAX_AGE = 60 * 5
+# Default tax in the cache, in seconds
+DEFAULT_TAX_CACHE_TIMEOUT = 60
+
 # JWT TOKEN
 
 SIMPLE_JWT = {
@@ -216,13 +260,28 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": True,
+    "TOKEN_OBTAIN_SERIALIZER":
+        "accounts.api.serializers.UserTokenObtainPairSerializer",
 }
+# Users cached by CachedUserJWTAuthentication, in seconds
+AUTH_USER_CACHE_TIMEOUT = 60
 
 # EMAIL conf
 
+EMAIL_BACKEND = config(
+    'EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_USE_TLS = True
 EMAIL_HOST = config('EMAIL_HOST')
 EMAIL_PORT = config('EMAIL_PORT', cast=int)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 
+# Emails sent by the send_queued_emails worker over one connection
+EMAIL_OUTBOX_BATCH_SIZE = 100
+# Sends of an email before it is marked as failed
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# Delay before the first retry, doubled on each next one, in seconds
+EMAIL_OUTBOX_RETRY_DELAY = 60
+# Time a worker has to send a claimed email before it is retried, in seconds
+EMAIL_OUTBOX_LEASE = 60 * 10
+
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from .models import User, UserProfile
+from .models import User, UserProfile, OutgoingEmail
 
 
 # Register your models here.
@@ -40,3 +40,11 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('user', 'created_at')
     search_fields = ('user', 'city')
     ordering = ('user', 'created_at')
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('to_email', 'subject')
+    ordering = ('-created_at',)
@@ -6,11 +6,18 @@ from django.contrib.auth import (
 )
 
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.db import transaction
 from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode
 
+from drf_spectacular.contrib.rest_framework_simplejwt import (
+    TokenObtainPairSerializerExtension,
+)
 from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from MarketPlace.core.authentication import add_token_user_claims
 
 from ..models import UserProfile
 
@@ -28,30 +35,28 @@ class RegisterUserSerializer(serializers.ModelSerializer):
                   'password', 'password2', 'phone_number')
         extra_kwargs = {'password': {'write_only': True, 'min_length': 8}}
 
-    def save(self, **kwargs):
-        """Save user and check valid password"""
-        password = self.validated_data['password']
-        password2 = self.validated_data['password2']
-
-        if password != password2:
+    def validate(self, attrs):
+        """Check passwords match before anything is hashed."""
+        if attrs['password'] != attrs['password2']:
             raise serializers.ValidationError(
                 {'error': 'P1 and P2 should be same.'})
+        return attrs
 
-        if get_user_model().objects.filter(
-                email=self.validated_data['email']).exists():
-            raise serializers.ValidationError(
-                {'error': 'Email already exists.'})
+    def save(self, **kwargs):
+        """Save user with a password hashed once.
 
-        user = get_user_model().objects.create_user(
-            email=self.validated_data['email'], password=password,
-            username=self.validated_data['username'],
-            first_name=self.validated_data['first_name'],
-            last_name=self.validated_data['last_name'],
-            phone_number=self.validated_data['phone_number'])
-        user.set_password(password)
-        user.save()
+        Email and username uniqueness is already checked by the
+        field validators, the profile is created by the post_save signal
+        in the same transaction.
+        """
+        validated_data = {**self.validated_data}
+        validated_data.pop('password2')
 
-        return user
+        with transaction.atomic(savepoint=False):
+            self.instance = get_user_model().objects.create_user(
+                **validated_data)
+
+        return self.instance
 
     def create(self, validated_data):
         """Create and return a user with encrypted password."""
@@ -69,6 +74,19 @@ class RegisterUserSerializer(serializers.ModelSerializer):
         return user
 
 
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Token pair with the claims of a stateless token user."""
+
+    @classmethod
+    def get_token(cls, user):
+        return add_token_user_claims(super().get_token(user), user)
+
+
+class UserTokenObtainPairSerializerExtension(
+        TokenObtainPairSerializerExtension):
+    target_class = 'accounts.api.serializers.UserTokenObtainPairSerializer'
+
+
 class EmailVerificationSerializer(serializers.Serializer):
     token = serializers.CharField(max_length=555)
 
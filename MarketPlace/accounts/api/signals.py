@@ -1,18 +1,24 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from accounts.models import UserProfile
+from MarketPlace.core.authentication import invalidate_cached_user
 
 
 @receiver(post_save, sender=get_user_model())
 def post_save_create_profile_receiver(sender, instance, created, **kwargs):
+    """Create the profile of a new user.
+
+    Later saves (logins, activation) do not touch the profile, missing
+    profiles are backfilled by the create_missing_profiles command.
+    """
     if created:
-        UserProfile.objects.create(user=instance)
-    else:
-        try:
-            profile = UserProfile.objects.get(user=instance)
-            profile.save()
-        except UserProfile.DoesNotExist:
-            # Create the user profile if not exist
-            UserProfile.objects.create(user=instance)
+        UserProfile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user_receiver(sender, instance, **kwargs):
+    """Drop the cached copy used by JWT authentication."""
+    invalidate_cached_user(instance.pk)
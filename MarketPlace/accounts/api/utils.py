@@ -1,10 +1,96 @@
-from django.core.mail import EmailMessage
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import OutgoingEmail, UserProfile
 
 
 class Util:
     @staticmethod
-    def send_verification_email(data):
-        email = EmailMessage(
+    def queue_email(data):
+        """Put an email into the outbox, it is sent by a worker."""
+        return OutgoingEmail.objects.create(
             subject=data['email_subject'], body=data['email_body'],
-            to=(data['to_email'],))
-        email.send()
+            to_email=data['to_email'])
+
+    @staticmethod
+    def claim_queued_emails(batch_size):
+        """Lease a batch of due emails to this worker.
+
+        Claimed emails are due again after EMAIL_OUTBOX_LEASE, so emails
+        of a worker which died while sending are retried. Emails out of
+        attempts are marked as failed instead of claimed.
+        """
+        max_attempts = settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+        now = timezone.now()
+        lease_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+
+        with transaction.atomic():
+            emails = list(OutgoingEmail.objects.select_for_update(
+                skip_locked=True).filter(
+                status=OutgoingEmail.PENDING, send_after__lte=now,
+            ).order_by('send_after', 'id')[:batch_size])
+            for email in emails:
+                if email.attempts >= max_attempts:
+                    email.status = OutgoingEmail.FAILED
+                    email.last_error = (
+                        email.last_error or 'Sending was interrupted.')
+                else:
+                    email.attempts += 1
+                    email.send_after = lease_until
+            OutgoingEmail.objects.bulk_update(emails, (
+                'status', 'attempts', 'last_error', 'send_after'))
+        return [email for email in emails
+                if email.status == OutgoingEmail.PENDING]
+
+    @staticmethod
+    def send_queued_emails(batch_size=None):
+        """Send one batch of due emails over a single connection.
+
+        Emails are claimed in a short transaction first, so no locks are
+        held while sending, and several workers can run at once. The
+        result of every email is saved right after its send. Failed sends
+        are retried with an exponential backoff until
+        EMAIL_OUTBOX_MAX_ATTEMPTS. Returns the number of sent emails.
+        """
+        emails = Util.claim_queued_emails(
+            batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+        if not emails:
+            return 0
+
+        sent = 0
+        with get_connection() as connection:
+            for email in emails:
+                message = EmailMessage(
+                    subject=email.subject, body=email.body,
+                    to=(email.to_email,), connection=connection)
+                try:
+                    message.send()
+                except Exception as error:
+                    result = {'last_error': str(error)}
+                    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                        result['status'] = OutgoingEmail.FAILED
+                    else:
+                        result['send_after'] = timezone.now() + timedelta(
+                            seconds=settings.EMAIL_OUTBOX_RETRY_DELAY *
+                            2 ** (email.attempts - 1))
+                else:
+                    result = {'status': OutgoingEmail.SENT,
+                              'sent_at': timezone.now()}
+                    sent += 1
+                OutgoingEmail.objects.filter(pk=email.pk).update(**result)
+        return sent
+
+    @staticmethod
+    def create_missing_profiles(batch_size=1000):
+        """Create profiles of users without one, returns their number."""
+        users = get_user_model().objects.filter(
+            user_profile__isnull=True).values_list('pk', flat=True)
+        profiles = UserProfile.objects.bulk_create(
+            (UserProfile(user_id=pk) for pk in users.iterator()),
+            batch_size=batch_size)
+        return len(profiles)
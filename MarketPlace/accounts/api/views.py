@@ -3,6 +3,7 @@ from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.contrib.sites.shortcuts import get_current_site
 from django.urls import reverse
 from django.conf import settings
+from django.db import transaction
 from django.utils.encoding import (
     smart_bytes, smart_str,
     DjangoUnicodeDecodeError
@@ -17,9 +18,10 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import AccessToken
 import jwt
 
+from MarketPlace.core.authentication import AuthenticationProfileMixin
 from .serializers import (
     RegisterUserSerializer, UserSerializer, UserProfileSerializer,
     ResetPasswordEmailSerializer, SetNewPasswordSerializer,
@@ -29,21 +31,25 @@ from ..models import UserProfile
 from .utils import Util
 
 
-class RegisterUserView(generics.GenericAPIView):
+class RegisterUserView(AuthenticationProfileMixin, generics.GenericAPIView):
     """Create(register) a new user in the system."""
+    authentication_profile = 'public'
     serializer_class = RegisterUserSerializer
     permission_classes = (AllowAny,)
 
     def post(self, request):
-        user = request.data
-        serializer = self.serializer_class(data=user)
+        serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        user_data = serializer.data
 
-        user = get_user_model().objects.get(email=user_data['email'])
+        with transaction.atomic():
+            user = serializer.save()
+            self.queue_verification_email(request, user)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        token = RefreshToken.for_user(user).access_token
+    def queue_verification_email(self, request, user):
+        """Queue the email with the account activation link."""
+        token = AccessToken.for_user(user)
 
         current_site = get_current_site(request).domain
         relative_link = reverse('accounts:email_activate')
@@ -55,13 +61,12 @@ class RegisterUserView(generics.GenericAPIView):
         data = {'email_body': email_body,
                 'email_subject': 'Verify your email',
                 'to_email': user.email}
-        Util.send_verification_email(data)
-
-        return Response(user_data, status=status.HTTP_201_CREATED)
+        Util.queue_email(data)
 
 
-class VerifyEmail(APIView):
+class VerifyEmail(AuthenticationProfileMixin, APIView):
     """Activate user with send email jwt token link"""
+    authentication_profile = 'public'
     serializer_class = EmailVerificationSerializer
 
     token_param_config = openapi.OpenApiParameter(
@@ -92,8 +97,10 @@ class VerifyEmail(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
 
-class ManagerUserView(generics.RetrieveUpdateDestroyAPIView):
+class ManagerUserView(AuthenticationProfileMixin,
+                      generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user."""
+    authentication_profile = 'api'
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
@@ -102,8 +109,10 @@ class ManagerUserView(generics.RetrieveUpdateDestroyAPIView):
         return self.request.user
 
 
-class RequestResetPasswordEmail(generics.GenericAPIView):
+class RequestResetPasswordEmail(AuthenticationProfileMixin,
+                                generics.GenericAPIView):
     """Request reset password with send email"""
+    authentication_profile = 'public'
     serializer_class = ResetPasswordEmailSerializer
 
     def post(self, request):
@@ -128,7 +137,7 @@ class RequestResetPasswordEmail(generics.GenericAPIView):
             data = {'email_body': email_body,
                     'email_subject': 'Resset your Password',
                     'to_email': user.email}
-            Util.send_verification_email(data)
+            Util.queue_email(data)
 
             return Response(
                 {'success': 'We have sent you a link to'
@@ -140,8 +149,10 @@ class RequestResetPasswordEmail(generics.GenericAPIView):
             status=status.HTTP_200_OK)
 
 
-class PasswordTokenCheckAPI(generics.GenericAPIView):
+class PasswordTokenCheckAPI(AuthenticationProfileMixin,
+                            generics.GenericAPIView):
     """Check password valid token"""
+    authentication_profile = 'public'
     serializer_class = PasswordTokenCheckSerializer
 
     token_param_config = openapi.OpenApiParameter(
@@ -172,8 +183,10 @@ class PasswordTokenCheckAPI(generics.GenericAPIView):
                 status=status.HTTP_401_UNAUTHORIZED)
 
 
-class SetNewPasswordAPIView(generics.GenericAPIView):
+class SetNewPasswordAPIView(AuthenticationProfileMixin,
+                            generics.GenericAPIView):
     """Set new password for user"""
+    authentication_profile = 'public'
     serializer_class = SetNewPasswordSerializer
 
     def patch(self, request):
@@ -187,8 +200,10 @@ class SetNewPasswordAPIView(generics.GenericAPIView):
 
 
 @extend_schema(tags=['UserProfile'])
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(AuthenticationProfileMixin,
+                      generics.RetrieveUpdateAPIView):
     """User Profile view for auth user"""
+    authentication_profile = 'api'
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
 
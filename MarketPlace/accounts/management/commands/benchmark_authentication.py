@@ -0,0 +1,86 @@
+import timeit
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cart.api.views import CartViewSet
+from MarketPlace.core.authentication import add_token_user_claims
+from orders.api.views import OrderViewSet
+from store.api.views import CategoryAPIView, ProductAPIView
+
+# (name, view class, authenticated)
+CASES = (
+    ('anonymous GET products', ProductAPIView, False),
+    ('anonymous GET categories', CategoryAPIView, False),
+    ('GET categories with a JWT', CategoryAPIView, True),
+    ('GET carts with a JWT', CartViewSet, True),
+    ('GET orders with a JWT', OrderViewSet, True),
+)
+
+
+class Command(BaseCommand):
+    help = ('Time request initialization and authentication of views with '
+            'their authentication profile and with the default chain.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number', type=int, default=1000,
+            help='Requests authenticated per timing.')
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Timings per case, the best one is reported.')
+
+    def authenticate(self, view_class, request, profile=True):
+        view = view_class()
+        if not profile:
+            view.authentication_profile = None
+            view.unsafe_authentication_profile = None
+        view.action_map = {'get': 'list'}
+        view.setup(request)
+        drf_request = view.initialize_request(request)
+        view.request = drf_request
+        view.perform_authentication(drf_request)
+
+    def handle(self, *args, **options):
+        username = f'bench-{uuid.uuid4().hex[:8]}'
+        user = get_user_model().objects.create_user(
+            username=username, email=f'{username}@example.com',
+            password='benchpass123', is_active=True)
+        token = add_token_user_claims(AccessToken.for_user(user), user)
+
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                self.run_cases(token, options)
+        finally:
+            user.delete()
+
+    def run_cases(self, token, options):
+        factory = APIRequestFactory()
+        for name, view_class, authenticated in CASES:
+            headers = ({'HTTP_AUTHORIZATION': f'Bearer {token}'}
+                       if authenticated else {})
+            results = []
+            for profile in (False, True):
+                def run():
+                    self.authenticate(
+                        view_class, factory.get('/', **headers), profile)
+
+                # Warm up caches, then count queries of one request
+                run()
+                with CaptureQueriesContext(connection) as queries:
+                    run()
+                best = min(timeit.repeat(
+                    run, number=options['number'],
+                    repeat=options['repeat']))
+                results.append((best / options['number'] * 10 ** 6,
+                                len(queries)))
+
+            (before, before_queries), (after, after_queries) = results
+            self.stdout.write(
+                f'{name}: {before:.0f}us, {before_queries} queries -> '
+                f'{after:.0f}us, {after_queries} queries')
@@ -0,0 +1,55 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = ('Register users through the API and report queries and '
+            'registrations per second. The users are deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', type=int, default=20,
+            help='Sequential registrations.')
+
+    def handle(self, *args, **options):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        client = APIClient()
+        url = reverse('accounts:register')
+
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']), \
+                    CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                for i in range(options['count']):
+                    res = client.post(url, {
+                        'first_name': 'Bench', 'last_name': 'User',
+                        'username': f'{prefix}-{i}',
+                        'email': f'{prefix}-{i}@example.com',
+                        'password': 'benchpass123',
+                        'password2': 'benchpass123',
+                    }, format='json')
+                    if res.status_code != 201:
+                        raise CommandError(
+                            f'Registration failed: {res.status_code} '
+                            f'{res.data}')
+                elapsed = time.perf_counter() - start
+        finally:
+            get_user_model().objects.filter(
+                username__startswith=prefix).delete()
+            OutgoingEmail.objects.filter(
+                to_email__startswith=prefix).delete()
+
+        count = options['count']
+        self.stdout.write(
+            f'{count} registrations in {elapsed:.2f}s: '
+            f'{len(queries) / count:.1f} queries per registration, '
+            f'{count / elapsed:.1f} registrations per second.')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from accounts.api.utils import Util
+
+
+class Command(BaseCommand):
+    help = 'Create profiles of users who do not have one.'
+
+    def handle(self, *args, **options):
+        created = Util.create_missing_profiles()
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} profiles.'))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.api.utils import Util
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails from the outbox in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Emails sent over one connection.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the outbox instead of exiting when empty.')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Seconds to wait when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                sent = Util.send_queued_emails(options['batch_size'])
+            except Exception as error:
+                if not options['loop']:
+                    raise
+                self.stderr.write(f'Sending emails failed: {error}')
+                sent = 0
+
+            if sent:
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent} emails.'))
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
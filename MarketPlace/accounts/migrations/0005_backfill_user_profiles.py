@@ -0,0 +1,25 @@
+# Generated by Django 4.2.4 on 2026-10-18 08:06
+
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+
+    users = User.objects.filter(
+        user_profile__isnull=True).values_list('pk', flat=True)
+    UserProfile.objects.bulk_create(
+        (UserProfile(user_id=pk) for pk in users.iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
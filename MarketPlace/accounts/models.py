@@ -12,6 +12,8 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from MarketPlace.core.authentication import add_token_user_claims
+
 
 class UserManager(BaseUserManager):
     """UserManager for Users."""
@@ -70,7 +72,7 @@ class User(AbstractBaseUser, PermissionsMixin):
         return f"{self.first_name.title()} {self.last_name.title()}"
 
     def tokens(self):
-        refresh = RefreshToken.for_user(self)
+        refresh = add_token_user_claims(RefreshToken.for_user(self), self)
         return {
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -102,3 +104,37 @@ class UserProfile(models.Model):
 
     def get_full_name(self):
         return f"{self.user.first_name.title()} {self.user.last_name.title()}"
+
+
+class OutgoingEmail(models.Model):
+    """Email waiting in the outbox for the send_queued_emails worker."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    to_email = models.EmailField(max_length=100)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    send_after = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    # additional fields
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('status', 'send_after'),
+                         name='outgoing_email_due_idx'),
+        )
+
+    def __str__(self):
+        return f"{self.to_email}-{self.subject}"
@@ -1,4 +1,7 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
 from ..models import UserProfile
@@ -46,3 +49,21 @@ class UsersManagersTests(TestCase):
         user.delete()
         userprofile = UserProfile.objects.all().exists()
         self.assertFalse(userprofile)
+
+    def test_save_user_does_not_touch_userprofile(self):
+        """Test saving an existing user is a single UPDATE."""
+        user = create_user()
+
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+    def test_create_missing_profiles_command(self):
+        """Test the command backfills profiles of users without one."""
+        user = create_user()
+        create_user(email='other@user.com', username='other')
+        UserProfile.objects.filter(user=user).delete()
+
+        call_command('create_missing_profiles', stdout=StringIO())
+
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+        self.assertEqual(UserProfile.objects.count(), 2)
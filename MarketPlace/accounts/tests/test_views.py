@@ -1,19 +1,31 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
 from faker import Faker
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
 
 from .test_setup import TestSetUp
 
-from ..models import UserProfile
+from ..models import UserProfile, OutgoingEmail
 
 fake = Faker()
 
 PROFILE_URL = reverse('accounts:profile')
+RESET_EMAIL_URL = reverse('accounts:request_resset_password')
 
 
 def create_user(first_name='test_first', last_name='test_last',
@@ -69,6 +81,18 @@ class TestAuthenticationViews(TestSetUp):
         res = client.get(self.user_url, data={'format': 'json'})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_user_login_token_has_user_claims(self):
+        payload = {
+            'email': 'test@gmail.com',
+            'password': 'testpass123',
+        }
+        user = create_user(**payload, is_active=True)
+        res = self.client.post(self.login_url, payload, format='json')
+
+        token = AccessToken(res.data['access'])
+        self.assertEqual(token['username'], user.username)
+        self.assertFalse(token['is_staff'])
+
     def test_user_registration_without_data(self):
         res = self.client.post(self.register_url)
 
@@ -82,6 +106,45 @@ class TestAuthenticationViews(TestSetUp):
         self.assertEqual(res.data['email'], self.user_data['email'])
         self.assertEqual(res.data['username'], self.user_data['username'])
 
+    def test_user_registration_hashes_password_once(self):
+        with mock.patch('django.contrib.auth.base_user.make_password',
+                        wraps=make_password) as hasher:
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(
+                    self.register_url, self.user_data, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(hasher.call_count, 1)
+        self.assertFalse([query for query in queries.captured_queries
+                          if query['sql'].startswith('UPDATE')])
+        user = get_user_model().objects.get(email=self.user_data['email'])
+        self.assertTrue(user.check_password(self.user_data['password']))
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+
+    def test_benchmark_registration(self):
+        out = StringIO()
+        call_command('benchmark_registration', '--count', '2', stdout=out)
+
+        self.assertIn('queries per registration', out.getvalue())
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+    def test_benchmark_authentication(self):
+        out = StringIO()
+        call_command('benchmark_authentication', '--number', '1',
+                     '--repeat', '1', stdout=out)
+
+        self.assertIn('GET orders with a JWT', out.getvalue())
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_user_registration_passwords_mismatch(self):
+        payload = {**self.user_data, 'password2': 'otherpass123'}
+        res = self.client.post(self.register_url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(OutgoingEmail.objects.exists())
+
     def test_user_cannot_login_with_unverified_email(self):
         self.client.post(self.register_url, self.user_data, format='json')
         res = self.client.post(
@@ -101,6 +164,101 @@ class TestAuthenticationViews(TestSetUp):
         )
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_user_registration_queues_email(self):
+        self.client.post(self.register_url, self.user_data, format='json')
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.to_email, self.user_data['email'])
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+
+    def test_request_reset_password_queues_email(self):
+        create_user(email='reset@gmail.com', username='reset')
+        res = self.client.post(RESET_EMAIL_URL, {'email': 'reset@gmail.com'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            OutgoingEmail.objects.get().to_email, 'reset@gmail.com')
+
+
+class OutgoingEmailTests(TestCase):
+
+    def queue_emails(self, count):
+        return [OutgoingEmail.objects.create(
+            subject='Verify your email', body='link',
+            to_email=f'user{i}@gmail.com') for i in range(count)]
+
+    def test_send_queued_emails(self):
+        self.queue_emails(3)
+        OutgoingEmail.objects.create(
+            subject='later', body='link', to_email='later@gmail.com',
+            send_after=timezone.now() + timedelta(hours=1))
+
+        call_command('send_queued_emails', stdout=mock.Mock())
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count(), 3)
+        self.assertEqual(
+            OutgoingEmail.objects.filter(
+                status=OutgoingEmail.PENDING).count(), 1)
+
+    def test_send_queued_emails_in_batches(self):
+        self.queue_emails(5)
+
+        with mock.patch(
+                'accounts.api.utils.get_connection',
+                wraps=mail.get_connection) as get_connection:
+            call_command(
+                'send_queued_emails', batch_size=2, stdout=mock.Mock())
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(get_connection.call_count, 3)
+
+    def test_send_queued_emails_worker_crash(self):
+        first, second, third = self.queue_emails(3)
+
+        with mock.patch('django.core.mail.EmailMessage.send',
+                        side_effect=[1, SystemExit]):
+            with self.assertRaises(SystemExit):
+                call_command('send_queued_emails', stdout=mock.Mock())
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, OutgoingEmail.SENT)
+        for email in (second, third):
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutgoingEmail.PENDING)
+            self.assertGreater(email.send_after, timezone.now())
+
+        OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING).update(
+            send_after=timezone.now())
+        call_command('send_queued_emails', stdout=mock.Mock())
+
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [second.to_email, third.to_email])
+        self.assertEqual(
+            OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count(), 3)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_send_queued_emails_retries(self):
+        [email] = self.queue_emails(1)
+
+        with mock.patch('django.core.mail.EmailMessage.send',
+                        side_effect=OSError('connection refused')):
+            call_command('send_queued_emails', stdout=mock.Mock())
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutgoingEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertGreater(email.send_after, timezone.now())
+
+            OutgoingEmail.objects.update(send_after=timezone.now())
+            call_command('send_queued_emails', stdout=mock.Mock())
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutgoingEmail.FAILED)
+            self.assertEqual(email.last_error, 'connection refused')
+
 
 class PublicUserApiTests(TestSetUp):
 
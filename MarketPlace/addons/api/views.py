@@ -1,5 +1,6 @@
 from rest_framework import viewsets, mixins
 
+from MarketPlace.core.authentication import AuthenticationProfileMixin
 from MarketPlace.core.permissions import IsAdminOrReadOnly
 from addons.models import News, Main, Licence, About
 from .serializers import (
@@ -8,9 +9,11 @@ from .serializers import (
 )
 
 
-class BaseAddonsAPIView(mixins.ListModelMixin,
+class BaseAddonsAPIView(AuthenticationProfileMixin,
+                        mixins.ListModelMixin,
                         mixins.RetrieveModelMixin,
                         viewsets.GenericViewSet):
+    authentication_profile = 'public'
     permission_classes = [IsAdminOrReadOnly]
 
 
@@ -1,7 +1,7 @@
-from rest_framework.pagination import PageNumberPagination
+from MarketPlace.core.paginations import KeysetPageNumberPagination
 
 
-class CartAPIListPagination(PageNumberPagination):
+class CartAPIListPagination(KeysetPageNumberPagination):
     page_size = 3
     page_size_query_param = 'page_size'
-    max_page_size = 10000
+    max_page_size = 100
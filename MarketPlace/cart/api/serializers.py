@@ -1,7 +1,9 @@
+from django.db import transaction
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
+from cart.api.utils import MAX_QUANTITY, add_cart_items
 from cart.models import Cart, CartItem
 from store.api.serializers import AttributeValueSerializer
 from store.models import Product, AttributeValue
@@ -34,25 +36,15 @@ class CartItemSerializer(serializers.ModelSerializer):
 
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
-    total_price = serializers.SerializerMethodField(source='get_total_price')
-    total_item = serializers.SerializerMethodField(source='get_total_item')
+    # Annotated by Cart.objects.with_totals(), new carts are empty.
+    total_price = serializers.IntegerField(read_only=True, default=0)
+    total_item = serializers.IntegerField(read_only=True, default=0)
 
     class Meta:
         model = Cart
         fields = ('id', 'user', 'total_price', 'total_item', 'items')
         extra_kwargs = {'user': {'read_only': True}}
 
-    @extend_schema_field(OpenApiTypes.INT)
-    def get_total_price(self, cart: Cart):
-        items = cart.items.all()
-        total = sum(
-            [item.quantity * item.product.price_new for item in items])
-        return total
-
-    @extend_schema_field(OpenApiTypes.INT)
-    def get_total_item(self, cart: Cart):
-        return cart.items.count()
-
 
 class AddCartItemSerializer(serializers.ModelSerializer):
     product = serializers.PrimaryKeyRelatedField(
@@ -67,28 +59,135 @@ class AddCartItemSerializer(serializers.ModelSerializer):
         fields = ('id', 'product', 'quantity', 'attribute_value')
 
     def save(self, **kwargs):
-        cart_id = self.context['cart_id']
-        product = self.validated_data['product']
-        quantity = self.validated_data['quantity']
-        attribute_value = self.validated_data['attribute_value']
+        [self.instance] = add_cart_items(self.context['cart_id'], [(
+            self.validated_data['product'].id,
+            self.validated_data['attribute_value'].id,
+            self.validated_data.get('quantity', 0),
+        )])
+        return self.instance
 
-        try:
-            cart_item = CartItem.objects.get(
-                product=product, cart_id=cart_id,
-                attribute_value=attribute_value
-            )
-            cart_item.quantity += quantity
-            cart_item.save()
 
-            self.instance = cart_item
+def validate_line_relations(lines):
+    """Check products and attribute values of cart lines in bulk."""
+    for model, field, name in (
+            (Product, 'product_id', 'Products'),
+            (AttributeValue, 'attribute_value_id', 'Attribute values')):
+        ids = {line[field] for line in lines if field in line}
+        if not ids:
+            continue
+        missing = sorted(ids - set(model.objects.filter(
+            id__in=ids).values_list('id', flat=True)))
+        if missing:
+            raise serializers.ValidationError(
+                {'error': f'{name} do not exist: {missing}'})
 
-        except CartItem.DoesNotExist:
-            self.instance = CartItem.objects.create(
-                cart_id=cart_id, **self.validated_data)
 
+class BulkAddCartItemListSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError(
+                {'error': 'Add at least one item.'})
+
+        validate_line_relations(attrs)
+        return attrs
+
+    def save(self, **kwargs):
+        self.instance = add_cart_items(self.context['cart_id'], [
+            (line['product_id'], line['attribute_value_id'],
+             line['quantity'])
+            for line in self.validated_data
+        ])
         return self.instance
 
 
+class BulkAddCartItemSerializer(serializers.Serializer):
+    """One line of a bulk add, related objects are checked in bulk."""
+    id = serializers.IntegerField(read_only=True)
+    product = serializers.IntegerField(source='product_id')
+    attribute_value = serializers.IntegerField(source='attribute_value_id')
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_QUANTITY)
+
+    class Meta:
+        list_serializer_class = BulkAddCartItemListSerializer
+
+
+class CartItemOperationListSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError(
+                {'error': 'Send at least one operation.'})
+
+        ids = [line['id'] for line in attrs if 'id' in line]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                {'error': 'Each item can be changed only once.'})
+
+        validate_line_relations(attrs)
+        return attrs
+
+    def save(self, **kwargs):
+        """Remove, update and then add lines in one transaction."""
+        cart_id = self.context['cart_id']
+        lines = {op: [] for op in CartItemOperationSerializer.OPERATIONS}
+        for line in self.validated_data:
+            lines[line['op']].append(line)
+
+        with transaction.atomic():
+            changed = [line['id']
+                       for line in lines['update'] + lines['remove']]
+            items = CartItem.objects.select_for_update().filter(
+                cart_id=cart_id).in_bulk(changed)
+            missing = sorted(set(changed) - set(items))
+            if missing:
+                raise serializers.ValidationError(
+                    {'error': f'Cart items do not exist: {missing}'})
+
+            if lines['remove']:
+                CartItem.objects.filter(
+                    pk__in=[line['id'] for line in lines['remove']]).delete()
+
+            for line in lines['update']:
+                items[line['id']].quantity = line['quantity']
+            CartItem.objects.bulk_update(
+                [items[line['id']] for line in lines['update']],
+                ['quantity'])
+
+            add_cart_items(cart_id, [
+                (line['product_id'], line['attribute_value_id'],
+                 line['quantity'])
+                for line in lines['add']
+            ])
+
+
+class CartItemOperationSerializer(serializers.Serializer):
+    """One add, update or remove operation of a cart batch."""
+    OPERATIONS = ('add', 'update', 'remove')
+    REQUIRED_FIELDS = {
+        'add': ('product', 'attribute_value', 'quantity'),
+        'update': ('id', 'quantity'),
+        'remove': ('id',),
+    }
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(required=False)
+    product = serializers.IntegerField(required=False, source='product_id')
+    attribute_value = serializers.IntegerField(
+        required=False, source='attribute_value_id')
+    quantity = serializers.IntegerField(
+        required=False, min_value=1, max_value=MAX_QUANTITY)
+
+    class Meta:
+        list_serializer_class = CartItemOperationListSerializer
+
+    def validate(self, attrs):
+        missing = [name for name in self.REQUIRED_FIELDS[attrs['op']]
+                   if self.fields[name].source not in attrs]
+        if missing:
+            raise serializers.ValidationError(
+                {'error': f"'{attrs['op']}' requires: {missing}"})
+        return attrs
+
+
 class UpdateCartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
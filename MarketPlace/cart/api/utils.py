@@ -0,0 +1,78 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from cart.models import CartItem
+
+UPSERT_FIELDS = ('cart', 'product', 'attribute_value', 'quantity',
+                 'created_at')
+LINE_FIELDS = ('cart', 'product', 'attribute_value')
+RETURNING_FIELDS = ('id', 'product', 'attribute_value', 'quantity')
+# Largest quantity of a cart line, CartItem.quantity is a small integer
+MAX_QUANTITY = 32767
+
+
+def too_many_items():
+    return serializers.ValidationError(
+        {'error': f'A cart line can hold at most {MAX_QUANTITY} items.'})
+
+
+def add_cart_items(cart_id, lines):
+    """Add `(product_id, attribute_value_id, quantity)` lines to a cart.
+
+    Every line is written with one INSERT ... ON CONFLICT DO UPDATE, which
+    adds the quantity to an existing line of the cart, so concurrent adds
+    neither duplicate lines nor lose increments. Returns the cart items
+    with their resulting quantities. Raises ValidationError and writes
+    nothing when a line would end up above MAX_QUANTITY.
+    """
+    quantities = Counter()
+    for product_id, attribute_value_id, quantity in lines:
+        quantities[(product_id, attribute_value_id)] += quantity
+    if not quantities:
+        return []
+    if max(quantities.values()) > MAX_QUANTITY:
+        raise too_many_items()
+
+    qn = connection.ops.quote_name
+
+    def columns(names):
+        return ', '.join(
+            qn(CartItem._meta.get_field(name).column) for name in names)
+
+    fields = [CartItem._meta.get_field(name) for name in UPSERT_FIELDS]
+    table = qn(CartItem._meta.db_table)
+    quantity = qn(CartItem._meta.get_field('quantity').column)
+    placeholders = ', '.join(
+        ['(%s)' % ', '.join(['%s'] * len(fields))] * len(quantities))
+
+    now = timezone.now()
+    params = []
+    for (product_id, attribute_value_id), qty in quantities.items():
+        values = (cart_id, product_id, attribute_value_id, qty, now)
+        params.extend(field.get_db_prep_save(value, connection)
+                      for field, value in zip(fields, values))
+
+    sql = (
+        f'INSERT INTO {table} ({columns(UPSERT_FIELDS)}) '
+        f'VALUES {placeholders} '
+        f'ON CONFLICT ({columns(LINE_FIELDS)}) DO UPDATE '
+        f'SET {quantity} = {table}.{quantity} + EXCLUDED.{quantity} '
+        f'WHERE {table}.{quantity} + EXCLUDED.{quantity} <= %s '
+        f'RETURNING {columns(RETURNING_FIELDS)}'
+    )
+    params.append(MAX_QUANTITY)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        # Lines which would overflow are not updated and not returned
+        if len(rows) != len(quantities):
+            raise too_many_items()
+
+    return [
+        CartItem(id=pk, cart_id=cart_id, product_id=product_id,
+                 attribute_value_id=attribute_value_id, quantity=qty)
+        for pk, product_id, attribute_value_id, qty in rows
+    ]
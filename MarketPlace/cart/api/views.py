@@ -1,32 +1,56 @@
+from django.db.models import Prefetch
 from drf_spectacular.utils import extend_schema, extend_schema_view
 from drf_spectacular import openapi
 
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from cart.api.paginations import CartAPIListPagination
 from cart.api.serializers import (
     CartSerializer, AddCartItemSerializer,
     CartItemSerializer, UpdateCartItemSerializer,
+    BulkAddCartItemSerializer, CartItemOperationSerializer,
 )
 from cart.models import Cart, CartItem
+from MarketPlace.core.authentication import AuthenticationProfileMixin
 
 
-class CartViewSet(viewsets.ModelViewSet):
+class CartViewSet(AuthenticationProfileMixin, viewsets.ModelViewSet):
     """Cart view for CRUD"""
-    queryset = Cart.objects.all().order_by('-created_at').prefetch_related(
-        'items__product',
-        'items__attribute_value__attribute')
+    queryset = Cart.objects.with_totals().order_by(
+        '-created_at').prefetch_related(
+        Prefetch('items', queryset=CartItem.objects.select_related(
+            'product__owner', 'attribute_value__attribute')))
     serializer_class = CartSerializer
+    authentication_profile = 'token_user'
+    unsafe_authentication_profile = 'api'
     permission_classes = [IsAuthenticated]
     pagination_class = CartAPIListPagination
     filter_backends = (OrderingFilter,)
 
     http_method_names = ['get', 'post', 'delete']
 
+    def get_queryset(self):
+        return self.queryset.filter(user_id=self.request.user.id)
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.id)
+
+    @action(detail=False, methods=['get'])
+    def me(self, request):
+        """Cart of the current user, created on first use."""
+        cart = self.get_queryset().first()
+        if cart is None:
+            cart, created = Cart.objects.get_or_create(
+                user_id=request.user.id)
+            if not created:
+                cart = self.get_queryset().get()
+
+        return Response(self.get_serializer(cart).data)
 
 
 @extend_schema(
@@ -46,21 +70,26 @@ class CartViewSet(viewsets.ModelViewSet):
         openapi.OpenApiParameter('id', openapi.OpenApiTypes.INT,
                                  openapi.OpenApiParameter.PATH)]),
 )
-class CartItemViewSet(viewsets.ModelViewSet):
+class CartItemViewSet(AuthenticationProfileMixin, viewsets.ModelViewSet):
     """CartItem view for CRUD"""
+    authentication_profile = 'token_user'
+    unsafe_authentication_profile = 'api'
     permission_classes = [IsAuthenticated]
 
     http_method_names = ['get', 'post', 'patch', 'delete']
 
     def get_queryset(self):
         return CartItem.objects.filter(
-            cart_id=self.kwargs['cart_pk']).prefetch_related(
-            'product', 'product__review__user', 'attribute_value',
-            'attribute_value__attribute',
-        ).select_related('attribute_value', 'attribute_value__attribute')
+            cart_id=self.kwargs['cart_pk'],
+            cart__user_id=self.request.user.id).select_related(
+            'product__owner', 'attribute_value__attribute')
 
     def get_serializer_class(self):
-        if self.request.method == 'POST':
+        if self.action == 'bulk':
+            return BulkAddCartItemSerializer
+        elif self.action == 'batch':
+            return CartItemOperationSerializer
+        elif self.request.method == 'POST':
             return AddCartItemSerializer
         elif self.request.method == 'PATCH':
             return UpdateCartItemSerializer
@@ -68,3 +97,38 @@ class CartItemViewSet(viewsets.ModelViewSet):
 
     def get_serializer_context(self):
         return {'cart_id': self.kwargs['cart_pk']}
+
+    def check_cart_owner(self):
+        """Only the owner of the cart can add items to it."""
+        get_object_or_404(Cart.objects.only('pk'),
+                          pk=self.kwargs['cart_pk'],
+                          user_id=self.request.user.id)
+
+    def perform_create(self, serializer):
+        self.check_cart_owner()
+        serializer.save()
+
+    @extend_schema(request=BulkAddCartItemSerializer(many=True),
+                   responses=BulkAddCartItemSerializer(many=True))
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, cart_pk=None):
+        """Add many items to the cart at once."""
+        self.check_cart_owner()
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(request=CartItemOperationSerializer(many=True),
+                   responses=CartSerializer)
+    @action(detail=False, methods=['post'])
+    def batch(self, request, cart_pk=None):
+        """Add, update and remove cart items in one transaction."""
+        self.check_cart_owner()
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        cart = get_object_or_404(CartViewSet.queryset, pk=cart_pk)
+        return Response(CartSerializer(cart).data)
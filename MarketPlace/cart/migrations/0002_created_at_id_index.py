@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 07:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['-created_at', '-id'], name='cart_created_at_id_idx'),
+        ),
+    ]
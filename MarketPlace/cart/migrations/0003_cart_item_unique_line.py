@@ -0,0 +1,35 @@
+# Generated by Django 4.2.4 on 2026-10-18 07:58
+
+from django.db import migrations, models
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    CartItem = apps.get_model('cart', 'CartItem')
+
+    duplicates = CartItem.objects.values(
+        'cart_id', 'product_id', 'attribute_value_id').annotate(
+        lines=models.Count('id'), total=models.Sum('quantity'),
+        first_id=models.Min('id')).filter(lines__gt=1)
+
+    for line in duplicates.iterator():
+        CartItem.objects.filter(pk=line['first_id']).update(
+            quantity=line['total'])
+        CartItem.objects.filter(
+            cart_id=line['cart_id'], product_id=line['product_id'],
+            attribute_value_id=line['attribute_value_id'],
+        ).exclude(pk=line['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_created_at_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product', 'attribute_value'), name='cart_item_unique_line'),
+        ),
+    ]
@@ -2,10 +2,22 @@ import uuid
 
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Coalesce
 
 from store.models import Product, AttributeValue
 
 
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate carts with the price and number of their items."""
+        return self.annotate(
+            total_price=Coalesce(
+                models.Sum(models.F('items__quantity') *
+                           models.F('items__product__price_new')),
+                0, output_field=models.PositiveIntegerField()),
+            total_item=models.Count('items'))
+
+
 class Cart(models.Model):
     id = models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True)
     user = models.OneToOneField(get_user_model(), on_delete=models.CASCADE)
@@ -13,6 +25,14 @@ class Cart(models.Model):
     # additional fields
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('-created_at', '-id'),
+                         name='cart_created_at_id_idx'),
+        )
+
     def __str__(self):
         return f"{self.id}"
 
@@ -29,5 +49,12 @@ class CartItem(models.Model):
     # additional fields
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('cart', 'product', 'attribute_value'),
+                name='cart_item_unique_line'),
+        )
+
     def __str__(self):
         return f"{self.product}-{self.quantity}"
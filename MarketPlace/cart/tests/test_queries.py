@@ -0,0 +1,79 @@
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.tests.test_views import create_user
+from MarketPlace.core.authentication import add_token_user_claims
+from cart.tests.test_models import create_cart
+from cart.tests.test_views import (
+    create_cart_item, detail_cart_items_url, list_cart_items_url,
+)
+from store.models import Attribute, AttributeValue, Brand, Category
+from store.tests.test_views import create_product, create_review
+
+CART_ITEM_QUERIES = 1
+
+
+class CartItemQueryTests(TestCase):
+
+    def setUp(self) -> None:
+        self.user = create_user(username='buyer', email='buyer@test.com')
+        self.cart = create_cart(self.user)
+        self.category = Category.objects.create(category_name='phones')
+        self.brand = Brand.objects.create(brand_name='apple')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_items(self, count):
+        """Add items of products with their own owners and reviews."""
+        items = []
+        for _ in range(count):
+            number = self.cart.items.count()
+            owner = create_user(
+                username=f'seller{number}', email=f'seller{number}@test.com')
+            attribute_value = AttributeValue.objects.create(
+                value=f'value{number}',
+                attribute=Attribute.objects.create(name=f'attr{number}'))
+            product = create_product(
+                owner=owner, category=self.category, brand=self.brand,
+                attribute_value=attribute_value,
+                product_name=f'product {number}')
+            create_review(self.user, product, 5)
+            items.append(create_cart_item(
+                cart=self.cart, product=product,
+                attribute_value=attribute_value, quantity=1))
+        return items
+
+    def test_list_cart_items_queries(self):
+        for count in (1, 10):
+            self.add_items(count)
+            with self.assertNumQueries(CART_ITEM_QUERIES):
+                res = self.client.get(list_cart_items_url(self.cart.id))
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data), self.cart.items.count())
+
+    def test_detail_cart_item_queries(self):
+        [item] = self.add_items(1)
+
+        with self.assertNumQueries(CART_ITEM_QUERIES):
+            res = self.client.get(detail_cart_items_url(self.cart.id, item.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['product']['owner'], item.product.owner.username)
+
+    def test_list_cart_items_with_jwt_skips_user_query(self):
+        self.add_items(2)
+        token = add_token_user_claims(
+            AccessToken.for_user(self.user), self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        with self.assertNumQueries(CART_ITEM_QUERIES):
+            res = client.get(list_cart_items_url(self.cart.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
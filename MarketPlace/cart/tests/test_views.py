@@ -1,17 +1,22 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
 from accounts.tests.test_views import create_user, create_superuser, fake
 from cart.models import (
     CartItem, Cart
 )
 from cart.tests.test_models import create_cart
+from MarketPlace.core.authentication import add_token_user_claims
 from store.models import Category, Brand, Attribute, AttributeValue
 from store.tests.test_views import create_product
 
 CART_URL = reverse('cart:cart-list')
+CART_ME_URL = reverse('cart:cart-me')
 
 
 def list_cart_items_url(cart_id):
@@ -24,6 +29,16 @@ def detail_cart_items_url(cart_id, item_id):
     return reverse('cart:cart-items-detail', args=[cart_id, item_id])
 
 
+def bulk_cart_items_url(cart_id):
+    """Create and return a cart items bulk add URL."""
+    return reverse('cart:cart-items-bulk', args=[cart_id])
+
+
+def batch_cart_items_url(cart_id):
+    """Create and return a cart items batch URL."""
+    return reverse('cart:cart-items-batch', args=[cart_id])
+
+
 def detail_cart_url(cart_id):
     """Create and return a cart detail URL."""
     return reverse('cart:cart-detail', args=[cart_id])
@@ -42,6 +57,13 @@ class PublicCartApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_list_cart_session_not_accepted(self):
+        user = create_user(is_active=True)
+        self.client.force_login(user)
+        res = self.client.get(CART_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_list_cart_item_unauthorized_error(self):
         cart = create_cart(user=create_user())
         url = detail_cart_url(cart.id)
@@ -84,6 +106,92 @@ class PrivateCartApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_cart_totals(self):
+        product = create_product(
+            owner=self.user_admin, category=self.category,
+            brand=self.brand, attribute_value=self.attribute_value,
+            product_name='second', price_new=10)
+        create_cart_item(
+            cart=self.cart, product=product,
+            attribute_value=self.attribute_value, quantity=3)
+
+        res = self.client.get(detail_cart_url(self.cart.id))
+
+        self.assertEqual(res.data['total_price'], 2 * 99 + 3 * 10)
+        self.assertEqual(res.data['total_item'], 2)
+
+    def test_create_cart_totals(self):
+        self.client.force_authenticate(self.user_admin)
+        res = self.client.post(CART_URL)
+
+        self.assertEqual(res.data['total_price'], 0)
+        self.assertEqual(res.data['total_item'], 0)
+
+    def test_list_cart_queries_independent_of_carts(self):
+        def list_queries():
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(CART_URL, {'page_size': 100})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        count = list_queries()
+        for i in range(5):
+            user = create_user(username=f'user{i}', email=f'user{i}@t.com')
+            create_cart_item(
+                cart=create_cart(user), product=self.product,
+                attribute_value=self.attribute_value, quantity=i + 1)
+
+        self.assertEqual(list_queries(), count)
+
+    def test_list_cart_only_own(self):
+        create_cart(self.user_admin)
+        res = self.client.get(CART_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [cart['id'] for cart in res.data['results']], [str(self.cart.id)])
+
+    def test_cart_me(self):
+        with self.assertNumQueries(2):
+            res = self.client.get(CART_ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], str(self.cart.id))
+        self.assertEqual(res.data['total_item'], 1)
+
+    def test_cart_me_creates_cart(self):
+        self.client.force_authenticate(self.user_admin)
+        res = self.client.get(CART_ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['user'], self.user_admin.id)
+        self.assertEqual(res.data['total_item'], 0)
+        self.assertEqual(Cart.objects.filter(user=self.user_admin).count(), 1)
+
+    def test_detail_other_user_cart_not_found(self):
+        cart = create_cart(self.user_admin)
+        res = self.client.get(detail_cart_url(cart.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_other_user_cart_items_not_changed(self):
+        self.client.force_authenticate(self.user_admin)
+        payload = {
+            'product': self.product.id,
+            'quantity': 1,
+            'attribute_value': self.attribute_value.id
+        }
+        res = self.client.post(list_cart_items_url(self.cart.id), payload)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.client.patch(
+            detail_cart_items_url(self.cart.id, self.cart_item.id),
+            {'quantity': 8})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.cart_item.refresh_from_db()
+        self.assertEqual(self.cart_item.quantity, 2)
+
     def test_list_cart_detail(self):
         url = detail_cart_url(self.cart.id)
         res = self.client.get(url)
@@ -125,6 +233,135 @@ class PrivateCartApiTests(TestCase):
         self.assertEqual(res.data['attribute_value'], self.attribute_value.id)
         self.assertEqual(res.data['product'], self.product.id)
 
+    def test_create_cart_item_keeps_one_line(self):
+        payload = {
+            'product': self.product.id,
+            'quantity': 1,
+            'attribute_value': self.attribute_value.id
+        }
+        for _ in range(3):
+            res = self.client.post(list_cart_items_url(self.cart.id), payload)
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(res.data['id'], self.cart_item.id)
+        self.assertEqual(res.data['quantity'], 5)
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 1)
+
+    def test_bulk_create_cart_items(self):
+        product = create_product(
+            owner=self.user_admin, category=self.category,
+            brand=self.brand, attribute_value=self.attribute_value,
+            product_name='second')
+        payload = [
+            {'product': self.product.id, 'quantity': 3,
+             'attribute_value': self.attribute_value.id},
+            {'product': product.id, 'quantity': 1,
+             'attribute_value': self.attribute_value.id},
+            {'product': product.id, 'quantity': 2,
+             'attribute_value': self.attribute_value.id},
+        ]
+        res = self.client.post(
+            bulk_cart_items_url(self.cart.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 2)
+        quantities = dict(CartItem.objects.filter(
+            cart=self.cart).values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.product.id: 5, product.id: 3})
+
+    def test_bulk_create_cart_items_quantity_limit(self):
+        product = create_product(
+            owner=self.user_admin, category=self.category,
+            brand=self.brand, attribute_value=self.attribute_value,
+            product_name='second')
+        line = {'product': product.id, 'quantity': 30000,
+                'attribute_value': self.attribute_value.id}
+        res = self.client.post(
+            bulk_cart_items_url(self.cart.id), [line, line], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CartItem.objects.filter(product=product).exists())
+
+        payload = [
+            {'product': product.id, 'quantity': 1,
+             'attribute_value': self.attribute_value.id},
+            {'product': self.product.id, 'quantity': 32766,
+             'attribute_value': self.attribute_value.id},
+        ]
+        res = self.client.post(
+            bulk_cart_items_url(self.cart.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CartItem.objects.filter(product=product).exists())
+        self.cart_item.refresh_from_db()
+        self.assertEqual(self.cart_item.quantity, 2)
+
+    def test_bulk_create_cart_items_missing_product(self):
+        payload = [
+            {'product': self.product.id, 'quantity': 3,
+             'attribute_value': self.attribute_value.id},
+            {'product': self.product.id + 100, 'quantity': 1,
+             'attribute_value': self.attribute_value.id},
+        ]
+        res = self.client.post(
+            bulk_cart_items_url(self.cart.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.cart_item.refresh_from_db()
+        self.assertEqual(self.cart_item.quantity, 2)
+
+    def test_batch_cart_items(self):
+        product = create_product(
+            owner=self.user_admin, category=self.category,
+            brand=self.brand, attribute_value=self.attribute_value,
+            product_name='second', price_new=10)
+        removed = create_cart_item(
+            cart=self.cart, product=product,
+            attribute_value=self.attribute_value, quantity=1)
+        third = create_product(
+            owner=self.user_admin, category=self.category,
+            brand=self.brand, attribute_value=self.attribute_value,
+            product_name='third', price_new=5)
+        payload = [
+            {'op': 'update', 'id': self.cart_item.id, 'quantity': 3},
+            {'op': 'remove', 'id': removed.id},
+            {'op': 'add', 'product': third.id, 'quantity': 4,
+             'attribute_value': self.attribute_value.id},
+        ]
+        res = self.client.post(
+            batch_cart_items_url(self.cart.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['total_price'], 3 * 99 + 4 * 5)
+        self.assertEqual(res.data['total_item'], 2)
+        quantities = dict(CartItem.objects.filter(
+            cart=self.cart).values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.product.id: 3, third.id: 4})
+
+    def test_batch_cart_items_rolls_back(self):
+        other_cart = create_cart(self.user_admin)
+        other_item = create_cart_item(
+            cart=other_cart, product=self.product,
+            attribute_value=self.attribute_value, quantity=1)
+        payload = [
+            {'op': 'update', 'id': self.cart_item.id, 'quantity': 3},
+            {'op': 'remove', 'id': other_item.id},
+        ]
+        res = self.client.post(
+            batch_cart_items_url(self.cart.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.cart_item.refresh_from_db()
+        self.assertEqual(self.cart_item.quantity, 2)
+        self.assertTrue(CartItem.objects.filter(pk=other_item.pk).exists())
+
+    def test_batch_cart_items_invalid_operation(self):
+        payload = [{'op': 'update', 'id': self.cart_item.id}]
+        res = self.client.post(
+            batch_cart_items_url(self.cart.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_update_cart_item(self):
         payload = {
             'quantity': 8,
@@ -158,3 +395,23 @@ class PrivateCartApiTests(TestCase):
         self.assertFalse(cart_item)
         cart = Cart.objects.all().exists()
         self.assertTrue(cart)
+
+    def test_deactivated_user_token_rejected_for_writes(self):
+        token = add_token_user_claims(
+            AccessToken.for_user(self.user_cus), self.user_cus)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.user_cus.is_active = False
+        self.user_cus.save()
+
+        res = client.get(list_cart_items_url(self.cart.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = client.patch(
+            detail_cart_items_url(self.cart.id, self.cart_item.id),
+            {'quantity': 5})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = client.post(CART_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.cart_item.refresh_from_db()
+        self.assertEqual(self.cart_item.quantity, 2)
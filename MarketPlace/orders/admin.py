@@ -2,7 +2,7 @@ from django.contrib import admin
 
 from orders.models import (
     Order, OrderItem, Tax,
-    ShippingAddress,
+    ShippingAddress, ProductSales, SellerSales, CategorySales,
 )
 
 
@@ -25,7 +25,8 @@ class OrderAdmin(admin.ModelAdmin):
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
-    list_display = ('order', 'product', 'quantity', 'created_at')
+    list_display = (
+        'order', 'product_name', 'unit_price', 'quantity', 'created_at')
 
 
 @admin.register(Tax)
@@ -39,3 +40,38 @@ class ShippingAddressAdmin(admin.ModelAdmin):
     list_display = ('order', 'country', 'oblast', 'city', 'created_at')
     ordering = ('created_at',)
     search_fields = ('country', 'oblast', 'city', 'depart_num',)
+
+
+class SalesRollupAdmin(admin.ModelAdmin):
+    list_filter = ('period',)
+    ordering = ('-period_start',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ProductSales)
+class ProductSalesAdmin(SalesRollupAdmin):
+    list_display = (
+        'product', 'period', 'period_start', 'orders', 'units', 'revenue',
+        'paid_revenue')
+    list_select_related = ('product',)
+
+
+@admin.register(SellerSales)
+class SellerSalesAdmin(SalesRollupAdmin):
+    list_display = (
+        'seller', 'period', 'period_start', 'orders', 'units', 'revenue',
+        'paid_revenue')
+    list_select_related = ('seller',)
+
+
+@admin.register(CategorySales)
+class CategorySalesAdmin(SalesRollupAdmin):
+    list_display = (
+        'category', 'period', 'period_start', 'orders', 'units', 'revenue',
+        'paid_revenue')
+    list_select_related = ('category',)
@@ -1,7 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+from MarketPlace.core.paginations import KeysetPageNumberPagination
 
 
-class OrderAPIListPagination(PageNumberPagination):
+class OrderAPIListPagination(KeysetPageNumberPagination):
     page_size = 3
     page_size_query_param = 'page_size'
-    max_page_size = 10000
+    max_page_size = 100
+
+
+class SalesReportPagination(KeysetPageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    keyset_field = 'period_start'
@@ -1,4 +1,4 @@
-from datetime import datetime
+from collections import defaultdict
 
 from django.db import transaction
 from drf_spectacular.utils import extend_schema_field
@@ -6,11 +6,15 @@ from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from cart.models import CartItem, Cart
-from cart.api.serializers import SimpleProductSerializer
+from orders.api.utils import (
+    ORDER_STATUS, ORDER_TRANSITIONS, TRANSITION_NOT_FOUND,
+    TRANSITION_UNCHANGED, TRANSITION_UPDATED, SaleLine, record_sales,
+)
 from orders.models import (
-    Order, OrderItem,
-    ShippingAddress, Tax,
+    CategorySales, Order, OrderItem, ProductSales, SalesRollup, SellerSales,
+    ShippingAddress, Tax, get_tax,
 )
+from store.api.utils import invalidate_product_detail, reserve_stock
 
 
 class TaxSerializer(serializers.ModelSerializer):
@@ -25,8 +29,19 @@ class ShippingAddressSerializer(serializers.ModelSerializer):
         exclude = ('id', 'order', 'created_at')
 
 
+class OrderItemProductSerializer(serializers.Serializer):
+    """Product of an order item as it was at the time of purchase."""
+    id = serializers.IntegerField(source='product_id')
+    product_name = serializers.CharField()
+    slug = serializers.CharField(source='product_slug')
+    owner = serializers.CharField(source='owner_username')
+    article = serializers.CharField()
+    price_new = serializers.IntegerField(source='unit_price')
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = SimpleProductSerializer(many=False, read_only=True)
+    product = OrderItemProductSerializer(
+        source='*', many=False, read_only=True)
 
     class Meta:
         model = OrderItem
@@ -63,9 +78,13 @@ class CreateOrderSerializer(serializers.ModelSerializer):
             'shipping_price', 'shipping_address')
 
     def validate_cart_id(self, cart_id):
-        if not Cart.objects.filter(id=cart_id).exists():
+        """The cart must belong to the ordering user and hold items."""
+        total_item = Cart.objects.with_totals().filter(
+            id=cart_id, user=self.context['user']).values_list(
+            'total_item', flat=True).first()
+        if total_item is None:
             raise serializers.ValidationError('This cart_id is invalid.')
-        elif not CartItem.objects.filter(cart_id=cart_id).exists():
+        elif not total_item:
             raise serializers.ValidationError('Sorry your cart is empty.')
 
         return cart_id
@@ -80,39 +99,50 @@ class CreateOrderSerializer(serializers.ModelSerializer):
 
             user = self.context['user']
 
-            # (1) Create order
-            order = Order.objects.create(
+            # (1) Load cart items with their products in one query
+            cart_items = list(CartItem.objects.filter(
+                cart_id=cart_id).select_related('product__owner'))
+
+            # (2) Business logic (total, quantities)
+            total = 0
+            quantities = defaultdict(int)
+            for item in cart_items:
+                total += item.product.price_new * item.quantity
+                quantities[item.product.id] += item.quantity
+
+            # (3) Reserve stock, rolls the order back when it runs out
+            out_of_stock = reserve_stock(quantities)
+            if out_of_stock:
+                names = sorted({
+                    item.product.product_name for item in cart_items
+                    if item.product.id in out_of_stock})
+                raise serializers.ValidationError(
+                    {'error': f"Not enough stock for: {', '.join(names)}."})
+            invalidate_product_detail(
+                {item.product.slug for item in cart_items})
+
+            # (4) Create order
+            tax = get_tax()
+            order = Order.objects.create_numbered(
                 user=user, payment_method=payment_method,
-                order_note=order_note, shipping_price=shipping_price)
+                order_note=order_note, shipping_price=shipping_price,
+                tax=tax, total_price=total + tax.value_tax + shipping_price)
 
-            # (2) Create shipping address
+            # (5) Create shipping address
             ShippingAddress.objects.create(order=order, **shipping_address)
 
-            # (3) Create order items and set order to orderItem
-            cart_items = CartItem.objects.filter(cart_id=cart_id)
-            order_items = [
-                OrderItem(order=order, product=item.product,
-                          quantity=item.quantity) for item in cart_items]
-            OrderItem.objects.bulk_create(order_items)
-
-            # (4) Business logic (total, order_number etc.)
+            # (6) Create order items
+            OrderItem.objects.bulk_create([
+                OrderItem.for_product(
+                    item.product, order=order, quantity=item.quantity)
+                for item in cart_items])
 
-            total = 0
-            order_number = ''
-            for item in order_items:
-                total += item.product.price_new * item.quantity
-                order_number += f"{item.product.product_name[0]}" \
-                                f"{item.product.category.category_name[0]}" \
-                                f"{item.product.brand.brand_name[0]}"
-                item.product.stock_qty -= item.quantity
-                item.product.save()
-
-            order.total_price = (total + order.tax.value_tax +
-                                 order.shipping_price)
-            now = datetime.now()
-            order.order_number = f"{order_number.upper()}" \
-                                 f"{now.strftime('%Y%m%H%M%S')}"
-            order.save()
+            # (7) Add the order to the sales rollups
+            record_sales(order.created_at, [
+                SaleLine(order.id, item.product.id, item.product.owner_id,
+                         item.product.category_id, item.quantity,
+                         item.product.price_new)
+                for item in cart_items])
 
             # Delete Cart
             # Cart.objects.filter(id=cart_id).delete()
@@ -123,4 +153,81 @@ class UpdateOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ('status',)
+        extra_kwargs = {'status': {'required': True}}
         # exclude = ('id', 'order_number', 'user', 'created_at', 'updated_at',)
+
+
+class OrderTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=1000)
+    transition = serializers.ChoiceField(choices=ORDER_TRANSITIONS)
+    status = serializers.ChoiceField(
+        choices=Order.PAYMENT_STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if attrs['transition'] == ORDER_STATUS and 'status' not in attrs:
+            raise serializers.ValidationError(
+                {'error': 'status is required to change the status.'})
+        attrs['ids'] = list(dict.fromkeys(attrs['ids']))
+        return attrs
+
+
+class OrderTransitionItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    result = serializers.ChoiceField(choices=(
+        TRANSITION_UPDATED, TRANSITION_UNCHANGED, TRANSITION_NOT_FOUND))
+
+
+class OrderTransitionResultSerializer(serializers.Serializer):
+    updated = serializers.IntegerField()
+    results = OrderTransitionItemSerializer(many=True)
+
+
+class SalesReportFilterSerializer(serializers.Serializer):
+    """Query parameters of the sales reports."""
+    period = serializers.ChoiceField(
+        choices=SalesRollup.PERIOD_CHOICES, default=SalesRollup.PERIOD_DAY)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def __init__(self, *args, key_field=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if key_field:
+            self.fields[key_field] = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if 'since' in attrs and 'until' in attrs and (
+                attrs['since'] > attrs['until']):
+            raise serializers.ValidationError(
+                {'error': 'since must not be later than until.'})
+        return attrs
+
+
+SALES_FIELDS = (
+    'id', 'period', 'period_start', 'orders', 'units', 'revenue',
+    'paid_orders', 'paid_units', 'paid_revenue')
+
+
+class ProductSalesSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.product_name')
+
+    class Meta:
+        model = ProductSales
+        fields = SALES_FIELDS + ('product', 'product_name')
+
+
+class SellerSalesSerializer(serializers.ModelSerializer):
+    seller_username = serializers.CharField(source='seller.username')
+
+    class Meta:
+        model = SellerSales
+        fields = SALES_FIELDS + ('seller', 'seller_username')
+
+
+class CategorySalesSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.category_name')
+
+    class Meta:
+        model = CategorySales
+        fields = SALES_FIELDS + ('category', 'category_name')
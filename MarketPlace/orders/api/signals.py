@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from orders.models import Tax, clear_tax_cache
+
+
+@receiver(post_save, sender=Tax)
+@receiver(post_delete, sender=Tax)
+def tax_cache_receiver(sender, **kwargs):
+    """Drop the cached default tax, again once the transaction commits."""
+    clear_tax_cache()
+    transaction.on_commit(clear_tax_cache)
@@ -7,12 +7,20 @@ from orders.api import views
 app_name = 'orders'
 
 router = routers.DefaultRouter()
+router.register('reports/products', views.ProductSalesViewSet,
+                basename='product-sales')
+router.register('reports/sellers', views.SellerSalesViewSet,
+                basename='seller-sales')
+router.register('reports/categories', views.CategorySalesViewSet,
+                basename='category-sales')
 router.register('', views.OrderViewSet, basename='orders')
 
 urlpatterns = [
     path('<int:pk>/pay/', views.OrderPayViewSet.as_view(), name='order_pay'),
     path('<int:pk>/deliver/', views.OrderDeliverViewSet.as_view(),
          name='order_deliver'),
+    path('transitions/', views.OrderTransitionView.as_view(),
+         name='order_transitions'),
     path('', include(router.urls)),
 
 ]
@@ -0,0 +1,208 @@
+from collections import defaultdict, namedtuple
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from orders.models import (
+    CategorySales, Order, OrderItem, ProductSales, SalesRollup, SellerSales,
+)
+
+# An order item as counted by the sales rollups
+SaleLine = namedtuple('SaleLine', (
+    'order_id', 'product_id', 'seller_id', 'category_id',
+    'quantity', 'unit_price'))
+
+# (rollup model, its key field, SaleLine attribute, OrderItem lookup)
+ROLLUPS = (
+    (ProductSales, 'product', 'product_id', 'product_id'),
+    (SellerSales, 'seller', 'seller_id', 'product__owner_id'),
+    (CategorySales, 'category', 'category_id', 'product__category_id'),
+)
+PERIODS = (SalesRollup.PERIOD_HOUR, SalesRollup.PERIOD_DAY)
+ORDERED_FIELDS = ('orders', 'units', 'revenue')
+PAID_FIELDS = ('paid_orders', 'paid_units', 'paid_revenue')
+
+ORDER_PAY = 'pay'
+ORDER_DELIVER = 'deliver'
+ORDER_STATUS = 'status'
+ORDER_TRANSITIONS = (ORDER_PAY, ORDER_DELIVER, ORDER_STATUS)
+# Per order results of a bulk transition
+TRANSITION_UPDATED = 'updated'
+TRANSITION_UNCHANGED = 'unchanged'
+TRANSITION_NOT_FOUND = 'not_found'
+
+
+def period_starts(moment):
+    """`(period, start)` of the hour and the day of `moment`."""
+    hour = timezone.localtime(moment).replace(
+        minute=0, second=0, microsecond=0)
+    return ((SalesRollup.PERIOD_HOUR, hour),
+            (SalesRollup.PERIOD_DAY, hour.replace(hour=0)))
+
+
+def increment_sales(model, key_field, rows, paid=False):
+    """Add `(key_id, period, period_start, orders, units, revenue)` rows.
+
+    All rows are written with one INSERT ... ON CONFLICT DO UPDATE which
+    adds them to the existing rollups, so concurrent checkouts never lose
+    an increment. Rows are written in key order, so concurrent writers
+    lock them in the same order.
+    """
+    if not rows:
+        return
+
+    counters = PAID_FIELDS if paid else ORDERED_FIELDS
+    names = (key_field, 'period', 'period_start') + ORDERED_FIELDS + (
+        PAID_FIELDS)
+    fields = [model._meta.get_field(name) for name in names]
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [qn(field.column) for field in fields]
+    updates = ', '.join(
+        f'{column} = {table}.{column} + EXCLUDED.{column}'
+        for column in (qn(model._meta.get_field(name).column)
+                       for name in counters))
+    placeholders = ', '.join(
+        ['(%s)' % ', '.join(['%s'] * len(fields))] * len(rows))
+
+    params = []
+    for key_id, period, period_start, *values in sorted(rows):
+        zeros = (0,) * len(values)
+        values = (zeros + tuple(values)) if paid else (tuple(values) + zeros)
+        params.extend(
+            field.get_db_prep_save(value, connection) for field, value in
+            zip(fields, (key_id, period, period_start) + values))
+
+    sql = (
+        f'INSERT INTO {table} ({", ".join(columns)}) '
+        f'VALUES {placeholders} '
+        f'ON CONFLICT ({", ".join(columns[:3])}) DO UPDATE SET {updates}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def record_sales(moment, lines, paid=False):
+    """Add the sale lines ordered (or paid) at `moment` to the rollups.
+
+    Lines without a seller are left out of the seller rollup.
+    """
+    periods = period_starts(moment)
+    for model, key_field, attribute, _ in ROLLUPS:
+        totals = defaultdict(lambda: [set(), 0, 0])
+        for line in lines:
+            key_id = getattr(line, attribute)
+            if key_id is None:
+                continue
+            for period, start in periods:
+                total = totals[(key_id, period, start)]
+                total[0].add(line.order_id)
+                total[1] += line.quantity
+                total[2] += line.quantity * line.unit_price
+
+        increment_sales(model, key_field, [
+            key + (len(orders), units, revenue)
+            for key, (orders, units, revenue) in totals.items()
+        ], paid=paid)
+
+
+def order_sale_lines(order_ids):
+    """Sale lines of the items of the orders."""
+    return [SaleLine(*values) for values in OrderItem.objects.filter(
+        order_id__in=order_ids).values_list(
+        'order_id', 'product_id', 'product__owner_id',
+        'product__category_id', 'quantity', 'unit_price')]
+
+
+@transaction.atomic
+def transition_orders(orders, transition, status=None):
+    """Move the orders of a queryset to another state.
+
+    The matching orders are locked and updated by id in one transaction.
+    Orders already in the target state are left alone, so retried
+    requests change nothing. Paid orders are added to the sales rollups.
+    Returns the ids of the changed orders.
+    """
+    moment = timezone.now()
+    if transition == ORDER_PAY:
+        order_ids = orders.mark_paid(moment)
+        if order_ids:
+            record_sales(moment, order_sale_lines(order_ids), paid=True)
+    elif transition == ORDER_DELIVER:
+        order_ids = orders.mark_delivered(moment)
+    else:
+        order_ids = orders.set_status(status, moment)
+    return order_ids
+
+
+def lock_sales_rollups():
+    """Hold back writes to the rollups until the transaction ends.
+
+    record_sales() of concurrent checkouts and payments waits for the
+    lock inside its own transaction. Reads of the reports go on and see
+    the rollups as they were before the transaction.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    qn = connection.ops.quote_name
+    tables = ', '.join(qn(model._meta.db_table) for model, *_ in ROLLUPS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {tables} IN SHARE ROW EXCLUSIVE MODE')
+
+
+@transaction.atomic
+def rebuild_sales_rollups(batch_size=1000):
+    """Recompute the sales rollups from the order history.
+
+    Runs in one transaction which locks the rollups first, so reports
+    never show a partial rebuild and sales recorded meanwhile wait for
+    it. Only orders which existed when the lock was taken are counted,
+    later ones are recorded by their own checkout. Orders are aggregated
+    by the database in batches of `batch_size`. Returns the number of
+    orders.
+    """
+    lock_sales_rollups()
+    for model, *_ in ROLLUPS:
+        model.objects.all().delete()
+
+    last_order_id = Order.objects.aggregate(last=Max('pk'))['last'] or 0
+    last_id = 0
+    count = 0
+    while True:
+        order_ids = list(Order.objects.filter(
+            pk__gt=last_id, pk__lte=last_order_id).order_by(
+            'pk').values_list('pk', flat=True)[:batch_size])
+        if not order_ids:
+            return count
+        last_id = order_ids[-1]
+        count += len(order_ids)
+
+        items = OrderItem.objects.filter(
+            order_id__gte=order_ids[0], order_id__lte=last_id)
+        events = (
+            (False, 'order__created_at', items),
+            (True, 'order__paid_at', items.filter(
+                order__is_paid=True, order__paid_at__isnull=False)),
+        )
+        for model, key_field, _, lookup in ROLLUPS:
+            for paid, moment, queryset in events:
+                for period in PERIODS:
+                    rows = queryset.filter(**{
+                        f'{lookup}__isnull': False,
+                    }).values(
+                        key_id=F(lookup),
+                        period_start=Trunc(moment, period),
+                    ).annotate(
+                        orders=Count('order_id', distinct=True),
+                        units=Sum('quantity'),
+                        revenue=Sum(F('unit_price') * F('quantity')),
+                    ).order_by().values_list(
+                        'key_id', 'period_start',
+                        'orders', 'units', 'revenue')
+                    increment_sales(model, key_field, [
+                        (key_id, period, start, *values)
+                        for key_id, start, *values in rows
+                    ], paid=paid)
@@ -1,20 +1,33 @@
-from django.utils.timezone import now
+from drf_spectacular import openapi
+from drf_spectacular.utils import extend_schema, extend_schema_view
 
-from rest_framework import viewsets, status
+from rest_framework import status, viewsets
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
 
-from orders.api.paginations import OrderAPIListPagination
+from orders.api.paginations import (
+    OrderAPIListPagination, SalesReportPagination,
+)
+from orders.api.utils import (
+    ORDER_DELIVER, ORDER_PAY, ORDER_STATUS, TRANSITION_NOT_FOUND,
+    TRANSITION_UNCHANGED, TRANSITION_UPDATED, transition_orders,
+)
 from orders.api.serializers import (
     OrderSerializer, CreateOrderSerializer,
-    UpdateOrderSerializer)
-from orders.models import Order
+    UpdateOrderSerializer, SalesReportFilterSerializer,
+    ProductSalesSerializer, SellerSalesSerializer, CategorySalesSerializer,
+    OrderTransitionSerializer, OrderTransitionResultSerializer)
+from orders.models import CategorySales, Order, ProductSales, SellerSales
+from MarketPlace.core.authentication import AuthenticationProfileMixin
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(AuthenticationProfileMixin, viewsets.ModelViewSet):
     """Order view"""
     http_method_names = ['get', 'post', 'patch', 'delete']
+    authentication_profile = 'api'
     pagination_class = OrderAPIListPagination
     filter_backends = (SearchFilter, OrderingFilter)
     search_fields = ('order_number', 'status')
@@ -33,19 +46,30 @@ class OrderViewSet(viewsets.ModelViewSet):
             data=request.data, context=context)
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
-        serializer = OrderSerializer(order)
+        serializer = OrderSerializer(self.get_queryset().get(pk=order.pk))
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def partial_update(self, request, *args, **kwargs):
+        serializer = UpdateOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if not str(kwargs['pk']).isdigit():
+            raise NotFound
+        orders = Order.objects.filter(pk=kwargs['pk'])
+        if not transition_orders(orders, ORDER_STATUS,
+                                 serializer.validated_data['status']):
+            get_object_or_404(orders)
+        return Response(serializer.data)
+
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
             return Order.objects.all().order_by('-created_at').select_related(
-                'user', 'tax').prefetch_related(
-                'order_item', 'order_item__product', 'address')
+                'user', 'tax', 'address').prefetch_related('order_item')
         return Order.objects.filter(user=user).order_by(
-            '-created_at').select_related('user', 'tax').prefetch_related(
-            'order_item', 'order_item__product', 'address')
+            '-created_at').select_related(
+            'user', 'tax', 'address').prefetch_related('order_item')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -55,45 +79,134 @@ class OrderViewSet(viewsets.ModelViewSet):
         return OrderSerializer
 
 
-class OrderPayViewSet(viewsets.views.APIView):
+class OrderPayViewSet(AuthenticationProfileMixin, viewsets.views.APIView):
+    authentication_profile = 'api'
     permission_classes = [IsAuthenticated]
     serializer_class = None
 
     def patch(self, request, pk=None):
-        try:
-            order = Order.objects.get(
-                pk=pk, user=self.request.user)
-        except Order.DoesNotExist:
-            return Response(
-                {'error': 'Order with this id does not exist.'},
-                status=status.HTTP_404_NOT_FOUND)
-        if not order.is_paid:
-            order.is_paid = True
-            order.paid_at = now()
-            order.save()
-        else:
+        orders = Order.objects.filter(pk=pk, user=self.request.user)
+        if not transition_orders(orders, ORDER_PAY):
+            if not orders.exists():
+                return Response(
+                    {'error': 'Order with this id does not exist.'},
+                    status=status.HTTP_404_NOT_FOUND)
             return Response({'error': 'Order already paid.'})
 
         return Response('Order was paid.')
 
 
-class OrderDeliverViewSet(viewsets.views.APIView):
+class OrderDeliverViewSet(AuthenticationProfileMixin,
+                          viewsets.views.APIView):
+    authentication_profile = 'api'
     permission_classes = [IsAuthenticated]
     serializer_class = None
 
     def patch(self, request, pk=None):
-        try:
-            order = Order.objects.get(
-                pk=pk, user=self.request.user)
-        except Order.DoesNotExist:
-            return Response(
-                {'error': 'Order with this id does not exist.'},
-                status=status.HTTP_404_NOT_FOUND)
-        if not order.is_delivered:
-            order.is_delivered = True
-            order.delivered_at = now()
-            order.save()
-        else:
+        orders = Order.objects.filter(pk=pk, user=self.request.user)
+        if not transition_orders(orders, ORDER_DELIVER):
+            if not orders.exists():
+                return Response(
+                    {'error': 'Order with this id does not exist.'},
+                    status=status.HTTP_404_NOT_FOUND)
             return Response({'error': 'Order already delivered.'})
 
         return Response('Order was delivered.')
+
+
+class OrderTransitionView(AuthenticationProfileMixin,
+                          viewsets.views.APIView):
+    """Pay, deliver or set the status of many orders, for staff."""
+    authentication_profile = 'api'
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(request=OrderTransitionSerializer,
+                   responses=OrderTransitionResultSerializer)
+    def post(self, request):
+        serializer = OrderTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order_ids = serializer.validated_data['ids']
+
+        changed = set(transition_orders(
+            Order.objects.filter(pk__in=order_ids),
+            serializer.validated_data['transition'],
+            serializer.validated_data.get('status')))
+        existing = changed | set(Order.objects.filter(
+            pk__in=set(order_ids) - changed).values_list('pk', flat=True))
+
+        results = [{
+            'id': order_id,
+            'result': (
+                TRANSITION_UPDATED if order_id in changed else
+                TRANSITION_UNCHANGED if order_id in existing else
+                TRANSITION_NOT_FOUND),
+        } for order_id in order_ids]
+        return Response(OrderTransitionResultSerializer(
+            {'updated': len(changed), 'results': results}).data)
+
+
+@extend_schema_view(list=extend_schema(parameters=[
+    openapi.OpenApiParameter(
+        'period', openapi.OpenApiTypes.STR, enum=('hour', 'day'),
+        description='Length of the periods, day by default.'),
+    openapi.OpenApiParameter(
+        'since', openapi.OpenApiTypes.DATETIME,
+        description='Periods starting at or after this time.'),
+    openapi.OpenApiParameter(
+        'until', openapi.OpenApiTypes.DATETIME,
+        description='Periods starting at or before this time.'),
+]))
+class SalesReportViewSet(AuthenticationProfileMixin,
+                         viewsets.ReadOnlyModelViewSet):
+    """Sales rollups for staff, newest periods first."""
+    authentication_profile = 'api'
+    permission_classes = [IsAdminUser]
+    pagination_class = SalesReportPagination
+    queryset = None
+    key_field = None
+
+    def get_queryset(self):
+        queryset = self.queryset.select_related(self.key_field).order_by(
+            '-period_start', '-id')
+        if self.action != 'list':
+            return queryset
+
+        params = SalesReportFilterSerializer(
+            data=self.request.query_params, key_field=self.key_field)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        filters = {'period': data['period']}
+        if 'since' in data:
+            filters['period_start__gte'] = data['since']
+        if 'until' in data:
+            filters['period_start__lte'] = data['until']
+        if self.key_field in data:
+            filters[f'{self.key_field}_id'] = data[self.key_field]
+        return queryset.filter(**filters)
+
+
+@extend_schema_view(list=extend_schema(parameters=[
+    openapi.OpenApiParameter(
+        'product', openapi.OpenApiTypes.INT, description='Product id.')]))
+class ProductSalesViewSet(SalesReportViewSet):
+    queryset = ProductSales.objects.all()
+    serializer_class = ProductSalesSerializer
+    key_field = 'product'
+
+
+@extend_schema_view(list=extend_schema(parameters=[
+    openapi.OpenApiParameter(
+        'seller', openapi.OpenApiTypes.INT, description='Seller id.')]))
+class SellerSalesViewSet(SalesReportViewSet):
+    queryset = SellerSales.objects.all()
+    serializer_class = SellerSalesSerializer
+    key_field = 'seller'
+
+
+@extend_schema_view(list=extend_schema(parameters=[
+    openapi.OpenApiParameter(
+        'category', openapi.OpenApiTypes.INT, description='Category id.')]))
+class CategorySalesViewSet(SalesReportViewSet):
+    queryset = CategorySales.objects.all()
+    serializer_class = CategorySalesSerializer
+    key_field = 'category'
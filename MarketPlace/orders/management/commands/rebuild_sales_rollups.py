@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from orders.api.utils import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = ('Recompute the sales rollups from the order history in one '
+            'transaction. Checkouts and payments wait for it to finish.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Orders aggregated at once.')
+
+    def handle(self, *args, **options):
+        count = rebuild_sales_rollups(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt sales rollups of {count} orders.'))
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.4 on 2026-10-18 08:17
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_product_snapshot(apps, schema_editor):
+    # Prices paid by earlier orders are unknown, current ones are used.
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    Product = apps.get_model('store', 'Product')
+
+    product = Product.objects.filter(pk=models.OuterRef('product_id'))
+
+    def snapshot(field, default=''):
+        # Products without an owner give NULL, the columns are NOT NULL
+        return Coalesce(models.Subquery(product.values(field)[:1]),
+                        models.Value(default))
+
+    OrderItem.objects.update(
+        product_name=snapshot('product_name'),
+        product_slug=snapshot('slug'),
+        article=snapshot('article'),
+        unit_price=snapshot('price_new', 0),
+        owner_username=snapshot('owner__username'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_created_at_id_index'),
+        ('store', '0004_created_at_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='article',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='owner_username',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_slug',
+            field=models.SlugField(blank=True, db_index=False),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_product_snapshot, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.4 on 2026-10-18 08:19
+
+from django.db import migrations, models
+
+SEQUENCE = 'orders_order_number_seq'
+
+
+def create_order_number_sequence(apps, schema_editor):
+    # Continue after the highest order number of the existing orders
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Order = apps.get_model('orders', 'Order')
+    last = Order.objects.filter(order_number__regex=r'^\d{10}$').aggregate(
+        last=models.Max('order_number'))['last']
+    schema_editor.execute(f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE}')
+    if last and int(last):
+        schema_editor.execute('SELECT setval(%s, %s)', [SEQUENCE, int(last)])
+
+
+def drop_order_number_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP SEQUENCE IF EXISTS {SEQUENCE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_item_product_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_order_number_sequence, drop_order_number_sequence),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.4 on 2026-10-18 08:21
+
+from django.db import migrations, models
+
+
+def keep_first_default_tax(apps, schema_editor):
+    Tax = apps.get_model('orders', 'Tax')
+
+    first = Tax.objects.filter(default=True).order_by('pk').first()
+    if first is not None:
+        Tax.objects.filter(default=True).exclude(pk=first.pk).update(
+            default=False)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_number_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_first_default_tax, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tax',
+            constraint=models.UniqueConstraint(condition=models.Q(('default', True)), fields=('default',), name='tax_single_default', violation_error_message='Only one tax can be the default.'),
+        ),
+    ]
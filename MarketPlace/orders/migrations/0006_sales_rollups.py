@@ -0,0 +1,92 @@
+# Generated by Django 4.2.4 on 2026-10-18 08:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('store', '0004_created_at_id_index'),
+        ('orders', '0005_tax_single_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('period_start', models.DateTimeField()),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveBigIntegerField(default=0)),
+                ('revenue', models.PositiveBigIntegerField(default=0)),
+                ('paid_orders', models.PositiveIntegerField(default=0)),
+                ('paid_units', models.PositiveBigIntegerField(default=0)),
+                ('paid_revenue', models.PositiveBigIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='store.product')),
+            ],
+            options={
+                'verbose_name_plural': 'product sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='CategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('period_start', models.DateTimeField()),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveBigIntegerField(default=0)),
+                ('revenue', models.PositiveBigIntegerField(default=0)),
+                ('paid_orders', models.PositiveIntegerField(default=0)),
+                ('paid_units', models.PositiveBigIntegerField(default=0)),
+                ('paid_revenue', models.PositiveBigIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='store.category')),
+            ],
+            options={
+                'verbose_name_plural': 'category sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='SellerSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('period_start', models.DateTimeField()),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveBigIntegerField(default=0)),
+                ('revenue', models.PositiveBigIntegerField(default=0)),
+                ('paid_orders', models.PositiveIntegerField(default=0)),
+                ('paid_units', models.PositiveBigIntegerField(default=0)),
+                ('paid_revenue', models.PositiveBigIntegerField(default=0)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'seller sales',
+                'indexes': [models.Index(fields=['period', '-period_start'], name='seller_sales_period_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sellersales',
+            constraint=models.UniqueConstraint(fields=('seller', 'period', 'period_start'), name='seller_sales_unique_period'),
+        ),
+        migrations.AddIndex(
+            model_name='productsales',
+            index=models.Index(fields=['period', '-period_start'], name='product_sales_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productsales',
+            constraint=models.UniqueConstraint(fields=('product', 'period', 'period_start'), name='product_sales_unique_period'),
+        ),
+        migrations.AddIndex(
+            model_name='categorysales',
+            index=models.Index(fields=['period', '-period_start'], name='category_sales_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='categorysales',
+            constraint=models.UniqueConstraint(fields=('category', 'period', 'period_start'), name='category_sales_unique_period'),
+        ),
+    ]
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.cache import cache
+from django.db import IntegrityError, connections, models, transaction
 
-from store.models import Product
+from store.models import Category, Product
 
 
 class Tax(models.Model):
@@ -9,15 +11,119 @@ class Tax(models.Model):
     value_tax = models.DecimalField(max_digits=5, decimal_places=2)
     default = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('default',), condition=models.Q(default=True),
+                name='tax_single_default',
+                violation_error_message='Only one tax can be the default.'),
+        )
+
     def __str__(self):
         return f"{self.name_tax}-{self.value_tax}"
 
 
+DEFAULT_TAX_CACHE_KEY = 'orders:default_tax'
+
+
 def get_tax():
-    tax = Tax.objects.filter(default=True)
-    if len(tax) >= 1:
-        return tax[0]
-    return None
+    """Default tax, cached for DEFAULT_TAX_CACHE_TIMEOUT seconds.
+
+    The cache is shared by all processes and saving or deleting a tax
+    drops it, so no process keeps using a changed or deleted tax.
+    """
+    cached = cache.get(DEFAULT_TAX_CACHE_KEY)
+    if cached is None:
+        # Wrapped, so a missing default tax is cached too
+        cached = (Tax.objects.filter(default=True).first(),)
+        cache.set(DEFAULT_TAX_CACHE_KEY, cached,
+                  settings.DEFAULT_TAX_CACHE_TIMEOUT)
+    return cached[0]
+
+
+def clear_tax_cache():
+    """Drop the cached default tax."""
+    cache.delete(DEFAULT_TAX_CACHE_KEY)
+
+
+# PostgreSQL sequence of order numbers, see allocate_order_number()
+ORDER_NUMBER_SEQUENCE = 'orders_order_number_seq'
+# Inserts of an order tried with fresh numbers on databases without sequences
+ORDER_NUMBER_ATTEMPTS = 5
+
+
+def allocate_order_number(using='default'):
+    """Next order number.
+
+    On PostgreSQL numbers come from a sequence, so concurrent checkouts
+    never get the same one without writing any row, and they grow
+    monotonically, which keeps inserts into the unique index at its
+    right edge. Databases without sequences, such as the SQLite of the
+    tests, continue after the highest number without any lock, so
+    concurrent checkouts may get the same number there: the unique
+    constraint rejects the second one, see OrderQuerySet.create_numbered().
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT nextval(%s)', [ORDER_NUMBER_SEQUENCE])
+            number = cursor.fetchone()[0]
+    else:
+        last = Order.objects.using(using).filter(
+            order_number__regex=r'^\d{10}$').aggregate(
+            last=models.Max('order_number'))['last']
+        number = int(last) + 1 if last else 1
+    return f'{number:010d}'
+
+
+class OrderQuerySet(models.QuerySet):
+    def create_numbered(self, **fields):
+        """Create an order with the next order number.
+
+        Where numbers do not come from a sequence, an insert which lost a
+        number to a concurrent checkout is retried with a fresh number.
+        """
+        if connections[self.db].vendor == 'postgresql':
+            return self.create(
+                order_number=allocate_order_number(self.db), **fields)
+
+        for attempt in range(ORDER_NUMBER_ATTEMPTS):
+            try:
+                with transaction.atomic(using=self.db):
+                    return self.create(
+                        order_number=allocate_order_number(self.db),
+                        **fields)
+            except IntegrityError:
+                if attempt == ORDER_NUMBER_ATTEMPTS - 1:
+                    raise
+
+    def lock_and_update(self, **values):
+        """Lock the rows and update them, returns the ids of the updated ones.
+
+        Must run inside a transaction, which holds the row locks until the
+        caller has finished with the returned ids.
+        """
+        ids = list(self.select_for_update().values_list('pk', flat=True))
+        if ids:
+            self.model._default_manager.using(self.db).filter(
+                pk__in=ids).update(**values)
+        return ids
+
+    def mark_paid(self, paid_at):
+        """Mark unpaid orders as paid, returns the ids of the changed ones."""
+        return self.filter(is_paid=False).lock_and_update(
+            is_paid=True, paid_at=paid_at, updated_at=paid_at)
+
+    def mark_delivered(self, delivered_at):
+        """Mark undelivered orders as delivered, returns the changed ids."""
+        return self.filter(is_delivered=False).lock_and_update(
+            is_delivered=True, delivered_at=delivered_at,
+            updated_at=delivered_at)
+
+    def set_status(self, status, updated_at):
+        """Set the status of orders, returns the ids of the changed ones."""
+        return self.exclude(status=status).lock_and_update(
+            status=status, updated_at=updated_at)
 
 
 class Order(models.Model):
@@ -55,6 +161,14 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('-created_at', '-id'),
+                         name='order_created_at_id_idx'),
+        )
+
     def __str__(self):
         return self.order_number
 
@@ -65,6 +179,13 @@ class OrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField()
 
+    # product at the time of purchase
+    product_name = models.CharField(max_length=255, blank=True)
+    product_slug = models.SlugField(blank=True, db_index=False)
+    article = models.CharField(max_length=50, blank=True)
+    unit_price = models.PositiveIntegerField(default=0)
+    owner_username = models.CharField(max_length=50, blank=True)
+
     # additional fields
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -72,6 +193,17 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.order}-{self.product}"
 
+    @classmethod
+    def for_product(cls, product, **kwargs):
+        """Order item with a snapshot of the product and its owner."""
+        return cls(
+            product=product, product_name=product.product_name,
+            product_slug=product.slug, article=product.article,
+            unit_price=product.price_new,
+            owner_username=(
+                product.owner.username if product.owner_id else ''),
+            **kwargs)
+
 
 class ShippingAddress(models.Model):
     order = models.OneToOneField(
@@ -87,3 +219,91 @@ class ShippingAddress(models.Model):
 
     def __str__(self):
         return self.address
+
+
+class SalesRollup(models.Model):
+    """Sales of an hour or a day, kept up to date at checkout and payment.
+
+    Ordered figures are counted at the time of checkout, paid figures at
+    the time of payment. Revenue is the price of the items, without tax
+    and shipping.
+    """
+    PERIOD_HOUR = 'hour'
+    PERIOD_DAY = 'day'
+
+    PERIOD_CHOICES = [
+        (PERIOD_HOUR, 'Hour'),
+        (PERIOD_DAY, 'Day'),
+    ]
+
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateTimeField()
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveBigIntegerField(default=0)
+    revenue = models.PositiveBigIntegerField(default=0)
+    paid_orders = models.PositiveIntegerField(default=0)
+    paid_units = models.PositiveBigIntegerField(default=0)
+    paid_revenue = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ProductSales(SalesRollup):
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='sales')
+
+    class Meta:
+        verbose_name_plural = 'product sales'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('product', 'period', 'period_start'),
+                name='product_sales_unique_period'),
+        )
+        indexes = (
+            models.Index(fields=('period', '-period_start'),
+                         name='product_sales_period_idx'),
+        )
+
+    def __str__(self):
+        return f"{self.product_id}-{self.period}-{self.period_start}"
+
+
+class SellerSales(SalesRollup):
+    seller = models.ForeignKey(
+        get_user_model(), on_delete=models.CASCADE, related_name='sales')
+
+    class Meta:
+        verbose_name_plural = 'seller sales'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('seller', 'period', 'period_start'),
+                name='seller_sales_unique_period'),
+        )
+        indexes = (
+            models.Index(fields=('period', '-period_start'),
+                         name='seller_sales_period_idx'),
+        )
+
+    def __str__(self):
+        return f"{self.seller_id}-{self.period}-{self.period_start}"
+
+
+class CategorySales(SalesRollup):
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name='sales')
+
+    class Meta:
+        verbose_name_plural = 'category sales'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('category', 'period', 'period_start'),
+                name='category_sales_unique_period'),
+        )
+        indexes = (
+            models.Index(fields=('period', '-period_start'),
+                         name='category_sales_period_idx'),
+        )
+
+    def __str__(self):
+        return f"{self.category_id}-{self.period}-{self.period_start}"
@@ -1,3 +1,5 @@
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.test import TestCase
 
 from accounts.tests.test_views import create_user, create_superuser, fake
@@ -6,7 +8,7 @@ from store.models import (
     Category, Brand, Attribute,
 )
 from orders.models import (
-    Tax, Order, OrderItem, ShippingAddress
+    DEFAULT_TAX_CACHE_KEY, Tax, Order, OrderItem, ShippingAddress, get_tax,
 )
 
 
@@ -62,6 +64,44 @@ class OrderTests(TestCase):
         self.assertEqual(tax.name_tax, 'test')
         self.assertEqual(tax.__str__(), 'test-44.99')
 
+    def test_single_default_tax(self):
+        Tax.objects.create(name_tax='test', value_tax='1', default=True)
+        Tax.objects.create(name_tax='other', value_tax='2')
+
+        with self.assertRaises(IntegrityError):
+            Tax.objects.create(name_tax='new', value_tax='3', default=True)
+
+    def test_get_tax_cached(self):
+        tax = Tax.objects.create(
+            name_tax='test', value_tax='44.99', default=True)
+
+        self.assertEqual(get_tax(), tax)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_tax(), tax)
+            Order(user=self.user_cus, payment_method='paypal')
+
+    def test_get_tax_cache_cleared_on_change(self):
+        tax = Tax.objects.create(
+            name_tax='test', value_tax='44.99', default=True)
+        self.assertEqual(str(get_tax().value_tax), '44.99')
+
+        tax.value_tax = '10.00'
+        tax.save()
+        self.assertEqual(str(get_tax().value_tax), '10.00')
+
+        tax.delete()
+        self.assertIsNone(get_tax())
+
+    def test_get_tax_shared_cache_cleared(self):
+        tax = Tax.objects.create(
+            name_tax='test', value_tax='44.99', default=True)
+        get_tax()
+        self.assertIsNotNone(cache.get(DEFAULT_TAX_CACHE_KEY))
+
+        Tax.objects.filter(pk=tax.pk).delete()
+
+        self.assertIsNone(cache.get(DEFAULT_TAX_CACHE_KEY))
+
     def test_create_order(self):
         tax = Tax.objects.create(
             name_tax='test', value_tax='44.99', default=True)
@@ -0,0 +1,138 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.tests.test_views import create_user, create_superuser
+from cart.tests.test_models import create_cart
+from cart.tests.test_views import create_cart_item
+from orders.models import (
+    Order, OrderItem, ShippingAddress, Tax, get_tax,
+)
+from orders.tests.test_views import order_payload
+from store.models import Attribute, AttributeValue, Brand, Category
+from store.tests.test_views import create_product
+
+ORDER_URL = reverse('orders:orders-list')
+
+
+class CheckoutQueryTests(TestCase):
+
+    def setUp(self) -> None:
+        self.owner = create_superuser()
+        self.attribute_value = AttributeValue.objects.create(
+            value='red', attribute=Attribute.objects.create(name='color'))
+        self.category = Category.objects.create(category_name='phones')
+        self.brand = Brand.objects.create(brand_name='apple')
+        Tax.objects.create(name_tax='test', value_tax='1', default=True)
+        get_tax()
+        self.client = APIClient()
+
+    def checkout_queries(self, cart_size):
+        """Number of queries of a checkout with `cart_size` products."""
+        user = create_user(
+            username=f'user{cart_size}', email=f'user{cart_size}@test.com')
+        cart = create_cart(user)
+        for i in range(cart_size):
+            product = create_product(
+                owner=self.owner, category=self.category, brand=self.brand,
+                attribute_value=self.attribute_value,
+                product_name=f'product {cart_size} {i}')
+            create_cart_item(
+                cart=cart, product=product,
+                attribute_value=self.attribute_value, quantity=2)
+        self.client.force_authenticate(user)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(
+                ORDER_URL, order_payload(cart.id), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['order_item']), cart_size)
+        return len(queries)
+
+    def test_checkout_queries_independent_of_cart_size(self):
+        counts = {size: self.checkout_queries(size) for size in (1, 10, 50)}
+
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_checkout_does_not_query_tax(self):
+        user = create_user(username='buyer', email='buyer@test.com')
+        cart = create_cart(user)
+        product = create_product(
+            owner=self.owner, category=self.category, brand=self.brand,
+            attribute_value=self.attribute_value)
+        create_cart_item(cart=cart, product=product,
+                         attribute_value=self.attribute_value, quantity=1)
+        self.client.force_authenticate(user)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(
+                ORDER_URL, order_payload(cart.id), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['tax']['value_tax'], '1.00')
+        self.assertFalse([query for query in queries
+                          if 'FROM "orders_tax"' in query['sql']])
+
+
+class OrderHistoryQueryTests(TestCase):
+
+    def setUp(self) -> None:
+        self.user = create_user()
+        self.attribute_value = AttributeValue.objects.create(
+            value='red', attribute=Attribute.objects.create(name='color'))
+        self.category = Category.objects.create(category_name='phones')
+        self.brand = Brand.objects.create(brand_name='apple')
+        self.tax = Tax.objects.create(
+            name_tax='test', value_tax='1', default=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_order(self, items):
+        """Order of `items` products, each from its own seller."""
+        number = Order.objects.count()
+        order = Order.objects.create(
+            user=self.user, tax=self.tax, payment_method='paypal',
+            order_number=f'ORDER{number}')
+        ShippingAddress.objects.create(
+            order=order, address='street', country='UA', oblast='Kyiv',
+            city='Kyiv', depart_num='1')
+        for i in range(items):
+            owner = create_user(
+                username=f'seller{number}-{i}',
+                email=f'seller{number}-{i}@test.com')
+            product = create_product(
+                owner=owner, category=self.category, brand=self.brand,
+                attribute_value=self.attribute_value,
+                product_name=f'product {number} {i}')
+            OrderItem.for_product(product, order=order, quantity=1).save()
+        return order
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ORDER_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_list_orders_queries_independent_of_items(self):
+        self.create_order(1)
+        count = self.list_queries()
+
+        self.create_order(5)
+        self.create_order(5)
+
+        self.assertEqual(self.list_queries(), count)
+
+    def test_detail_order_queries(self):
+        order = self.create_order(5)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                reverse('orders:orders-detail', args=[order.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['order_item']), 5)
@@ -1,21 +1,36 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
 from accounts.models import User
 from accounts.tests.test_views import create_user, create_superuser, fake
 from cart.tests.test_models import create_cart
 from cart.tests.test_views import create_cart_item
+from orders.api import utils
 from orders.api.serializers import OrderSerializer
-from orders.models import Order, Tax, OrderItem
+from orders.models import (
+    CategorySales, Order, ProductSales, SellerSales, Tax, OrderItem,
+)
+from store.api.utils import reserve_stock
 from store.models import (
     Product, AttributeValue,
     Category, Brand, Attribute,
 )
 
 ORDER_URL = reverse('orders:orders-list')
+PRODUCT_SALES_URL = reverse('orders:product-sales-list')
+SELLER_SALES_URL = reverse('orders:seller-sales-list')
+ORDER_TRANSITIONS_URL = reverse('orders:order_transitions')
 
 
 def detail_order_url(order_id):
@@ -44,6 +59,22 @@ def create_order(
     return order
 
 
+def order_payload(cart_id):
+    return {
+        'cart_id': cart_id,
+        'payment_method': 'paypal',
+        'order_note': '',
+        'shipping_price': 44,
+        'shipping_address': {
+            "address": "string",
+            "country": "string",
+            "oblast": "string",
+            "city": "string",
+            "depart_num": "string"
+        }
+    }
+
+
 class PublicOrderApiTests(TestCase):
 
     def test_list_orders_unauthorized(self):
@@ -106,6 +137,34 @@ class PrivateOrderApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def jwt_client(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def test_list_order_jwt_user_cached(self):
+        client = self.jwt_client(self.user_cus)
+        client.get(ORDER_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = client.get(ORDER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['id'], self.order.id)
+        self.assertFalse([query for query in queries.captured_queries
+                          if '"accounts_user"."id" = ' in query['sql']])
+
+    def test_list_order_jwt_user_deactivated(self):
+        client = self.jwt_client(self.user_cus)
+        client.get(ORDER_URL)
+
+        self.user_cus.is_active = False
+        self.user_cus.save()
+        res = client.get(ORDER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_detail_order(self):
         url = detail_order_url(self.order.id)
         res = self.client.get(url)
@@ -140,6 +199,104 @@ class PrivateOrderApiTests(TestCase):
             res.data['shipping_address']['address'],
             payload['shipping_address']['address'])
 
+    def test_create_order_reserves_stock(self):
+        self.client.force_authenticate(self.user_cus2)
+
+        res = self.client.post(
+            ORDER_URL, order_payload(self.cart2.id), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_qty, 10)
+
+    def test_create_orders_same_cart_contents(self):
+        numbers = []
+        for cart, user in ((self.cart, self.user_admin),
+                           (self.cart2, self.user_cus2)):
+            self.client.force_authenticate(user)
+            res = self.client.post(
+                ORDER_URL, order_payload(cart.id), format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            numbers.append(res.data['order_number'])
+
+        self.assertLess(numbers[0], numbers[1])
+        self.assertEqual(len(numbers[0]), 10)
+
+    def test_create_order_number_taken(self):
+        # A concurrent checkout took the number allocated first
+        taken = create_order(
+            user=self.user_cus, tax=self.tax, order_number='0000000042')
+        allocate = mock.Mock(side_effect=['0000000042', '0000000043'])
+        self.client.force_authenticate(self.user_cus2)
+
+        with mock.patch('orders.models.allocate_order_number', allocate):
+            res = self.client.post(
+                ORDER_URL, order_payload(self.cart2.id), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['order_number'], '0000000043')
+        self.assertEqual(allocate.call_count, 2)
+        self.assertEqual(Order.objects.get(pk=taken.pk).user, self.user_cus)
+
+    def test_order_keeps_product_snapshot(self):
+        self.client.force_authenticate(self.user_cus2)
+        res = self.client.post(
+            ORDER_URL, order_payload(self.cart2.id), format='json')
+        Product.objects.filter(pk=self.product.pk).update(
+            product_name='renamed', price_new=1)
+
+        res = self.client.get(detail_order_url(res.data['id']))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        product = res.data['order_item'][0]['product']
+        self.assertEqual(product['id'], self.product.id)
+        self.assertEqual(product['product_name'], self.product.product_name)
+        self.assertEqual(product['price_new'], self.product.price_new)
+        self.assertEqual(product['owner'], self.user_admin.username)
+        self.assertEqual(product['article'], self.product.article)
+
+    def test_create_order_other_user_cart(self):
+        res = self.client.post(
+            ORDER_URL, order_payload(self.cart2.id), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cart_id', res.data)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_qty, 12)
+        self.assertTrue(self.cart2.items.exists())
+        self.assertFalse(Order.objects.filter(user=self.user_cus).exclude(
+            pk=self.order.pk).exists())
+
+    def test_create_order_product_without_owner(self):
+        self.client.force_authenticate(self.user_cus2)
+        Product.objects.filter(pk=self.product.pk).update(owner=None)
+
+        res = self.client.post(
+            ORDER_URL, order_payload(self.cart2.id), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        [item] = res.data['order_item']
+        self.assertEqual(item['product']['owner'], '')
+        self.assertEqual(
+            item['product']['product_name'], self.product.product_name)
+
+    def test_create_order_out_of_stock(self):
+        self.client.force_authenticate(self.user_cus2)
+        create_cart_item(
+            cart=self.cart2, product=self.product,
+            attribute_value=AttributeValue.objects.create(
+                value='blue', attribute=self.attribute),
+            quantity=11)
+
+        res = self.client.post(
+            ORDER_URL, order_payload(self.cart2.id), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(self.product.product_name, res.data['error'])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_qty, 12)
+        self.assertFalse(Order.objects.filter(user=self.user_cus2).exists())
+
     def test_delete_order(self):
         url = detail_order_url(self.order.id)
         res = self.client.delete(url)
@@ -174,3 +331,243 @@ class PrivateOrderApiTests(TestCase):
         res = self.client.patch(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_order_pay_twice(self):
+        url = reverse('orders:order_pay', args=[self.order.id])
+        self.client.patch(url)
+        paid_at = Order.objects.get(pk=self.order.id).paid_at
+
+        res = self.client.patch(url)
+
+        self.assertEqual(res.data, {'error': 'Order already paid.'})
+        order = Order.objects.get(pk=self.order.id)
+        self.assertTrue(order.is_paid)
+        self.assertEqual(order.paid_at, paid_at)
+
+    def test_order_deliver_twice(self):
+        url = reverse('orders:order_deliver', args=[self.order.id])
+        self.client.patch(url)
+
+        res = self.client.patch(url)
+
+        self.assertEqual(res.data, {'error': 'Order already delivered.'})
+        self.assertTrue(Order.objects.get(pk=self.order.id).is_delivered)
+
+    def test_order_pay_other_user(self):
+        self.client.force_authenticate(self.user_cus2)
+        url = reverse('orders:order_pay', args=[self.order.id])
+
+        res = self.client.patch(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Order.objects.get(pk=self.order.id).is_paid)
+
+    def test_partial_update_order_same_status(self):
+        self.client.force_authenticate(self.user_admin)
+        url = detail_order_url(self.order.id)
+
+        res = self.client.patch(url, {'status': self.order.status})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        for order_id in (0, 'x'):
+            res = self.client.patch(
+                detail_order_url(order_id), {'status': 'C'})
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_transition_orders(self):
+        self.client.force_authenticate(self.user_admin)
+        delivered = create_order(
+            user=self.user_cus, tax=self.tax, order_number='DD334')
+        delivered.is_delivered = True
+        delivered.save()
+        payload = {'ids': [self.order.id, delivered.id, 999, self.order.id],
+                   'transition': 'deliver'}
+
+        with self.assertNumQueries(5):
+            res = self.client.post(
+                ORDER_TRANSITIONS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], 1)
+        self.assertEqual([dict(row) for row in res.data['results']], [
+            {'id': self.order.id, 'result': 'updated'},
+            {'id': delivered.id, 'result': 'unchanged'},
+            {'id': 999, 'result': 'not_found'},
+        ])
+        self.assertTrue(Order.objects.get(pk=self.order.id).is_delivered)
+
+    def test_bulk_transition_orders_status(self):
+        self.client.force_authenticate(self.user_admin)
+        payload = {'ids': [self.order.id], 'transition': 'status'}
+
+        res = self.client.post(ORDER_TRANSITIONS_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        payload['status'] = 'F'
+        res = self.client.post(ORDER_TRANSITIONS_URL, payload, format='json')
+        self.assertEqual(res.data['updated'], 1)
+        self.assertEqual(Order.objects.get(pk=self.order.id).status, 'F')
+
+    def test_bulk_transition_orders_staff_only(self):
+        res = self.client.post(ORDER_TRANSITIONS_URL, {
+            'ids': [self.order.id], 'transition': 'pay'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Order.objects.get(pk=self.order.id).is_paid)
+
+
+class SalesRollupTests(TestCase):
+
+    def setUp(self) -> None:
+        self.seller = create_superuser()
+        self.buyer = create_user(is_active=True)
+        attribute_value = AttributeValue.objects.create(
+            value='red', attribute=Attribute.objects.create(name='color'))
+        self.category = Category.objects.create(category_name='test_cat1')
+        self.product = create_product(
+            owner=self.seller, category=self.category,
+            brand=Brand.objects.create(brand_name='test_brand1'),
+            attribute_value=attribute_value, price_new=10)
+        Tax.objects.create(name_tax='test', value_tax='1', default=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.cart = cart = create_cart(self.buyer)
+        item = create_cart_item(cart=cart, product=self.product,
+                                attribute_value=attribute_value, quantity=2)
+        for quantity in (2, 3):
+            item.quantity = quantity
+            item.save()
+            res = self.client.post(
+                ORDER_URL, order_payload(cart.id), format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.order = Order.objects.order_by('pk').last()
+
+    def rollups(self):
+        return {
+            model.__name__: sorted(model.objects.values_list(
+                'period', 'orders', 'units', 'revenue',
+                'paid_orders', 'paid_units', 'paid_revenue'))
+            for model in (ProductSales, SellerSales, CategorySales)}
+
+    def test_checkout_updates_rollups(self):
+        for rows in self.rollups().values():
+            self.assertEqual(rows, [
+                ('day', 2, 5, 50, 0, 0, 0), ('hour', 2, 5, 50, 0, 0, 0)])
+        self.assertEqual(ProductSales.objects.filter(
+            product=self.product).count(), 2)
+        self.assertEqual(SellerSales.objects.filter(
+            seller=self.seller).count(), 2)
+
+    def test_pay_updates_rollups(self):
+        url = reverse('orders:order_pay', args=[self.order.id])
+        self.client.patch(url)
+        self.client.patch(url)
+
+        for rows in self.rollups().values():
+            self.assertEqual(rows, [
+                ('day', 2, 5, 50, 1, 3, 30), ('hour', 2, 5, 50, 1, 3, 30)])
+
+    def test_rebuild_sales_rollups(self):
+        self.client.patch(reverse('orders:order_pay', args=[self.order.id]))
+        rollups = self.rollups()
+
+        call_command('rebuild_sales_rollups', '--batch-size', '1',
+                     stdout=StringIO())
+
+        self.assertEqual(self.rollups(), rollups)
+
+    def test_rebuild_sales_rollups_with_checkout(self):
+        increment_sales = utils.increment_sales
+        checkouts = []
+
+        def checkout_during_rebuild(*args, **kwargs):
+            # A checkout lands while the first batch is counted
+            if not checkouts:
+                checkouts.append(None)
+                checkouts[0] = self.client.post(
+                    ORDER_URL, order_payload(self.cart.id), format='json')
+            return increment_sales(*args, **kwargs)
+
+        with mock.patch.object(utils, 'increment_sales',
+                               side_effect=checkout_during_rebuild):
+            count = utils.rebuild_sales_rollups(batch_size=1)
+
+        self.assertEqual(count, 2)
+        self.assertEqual(checkouts[0].status_code, status.HTTP_201_CREATED)
+        for rows in self.rollups().values():
+            self.assertEqual(rows, [
+                ('day', 3, 8, 80, 0, 0, 0), ('hour', 3, 8, 80, 0, 0, 0)])
+
+    def test_sales_reports_staff_only(self):
+        res = self.client.get(PRODUCT_SALES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_sales_reports(self):
+        self.client.force_authenticate(self.seller)
+
+        res = self.client.get(PRODUCT_SALES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        [row] = res.data['results']
+        self.assertEqual(row['period'], 'day')
+        self.assertEqual(row['product_name'], self.product.product_name)
+        self.assertEqual(row['revenue'], 50)
+
+        res = self.client.get(
+            SELLER_SALES_URL, {'period': 'hour', 'seller': self.seller.id})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        [row] = res.data['results']
+        self.assertEqual(row['seller_username'], self.seller.username)
+        self.assertEqual(row['units'], 5)
+
+        res = self.client.get(SELLER_SALES_URL, {'seller': self.buyer.id})
+        self.assertEqual(res.data['results'], [])
+
+    def test_sales_reports_invalid_filters(self):
+        self.client.force_authenticate(self.seller)
+
+        for params in ({'period': 'week'}, {'seller': 'me'},
+                       {'since': '2026-10-18', 'until': '2026-10-17'}):
+            res = self.client.get(SELLER_SALES_URL, params)
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class ConcurrentStockTests(TransactionTestCase):
+
+    def setUp(self) -> None:
+        attribute_value = AttributeValue.objects.create(
+            value='red', attribute=Attribute.objects.create(name='color'))
+        self.product = create_product(
+            owner=create_superuser(), category=Category.objects.create(
+                category_name='test_cat1'),
+            brand=Brand.objects.create(brand_name='test_brand1'),
+            attribute_value=attribute_value, stock_qty=3)
+
+    def reserve(self, results, barrier):
+        try:
+            barrier.wait()
+            with transaction.atomic():
+                results.append(not reserve_stock({self.product.id: 1}))
+        except OperationalError:
+            # SQLite reports conflicting writers as a locked database.
+            results.append(False)
+        finally:
+            connection.close()
+
+    def test_concurrent_reservations_do_not_oversell(self):
+        results = []
+        barrier = threading.Barrier(6)
+        threads = [
+            threading.Thread(target=self.reserve, args=(results, barrier))
+            for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.product.refresh_from_db()
+        self.assertEqual(len(results), 6)
+        self.assertEqual(self.product.stock_qty, 3 - results.count(True))
+        if connection.features.has_select_for_update:
+            self.assertEqual(results.count(True), 3)
@@ -0,0 +1,147 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, SearchFilter
+
+from store.api.utils import (
+    SEARCH_CONFIG, get_product_facets_version, search_vector_supported,
+)
+from store.models import Product
+
+
+class ProductSearchFilter(SearchFilter):
+    """Ranked full-text search over the stored product search vector.
+
+    Every search term is matched as a prefix, so the GIN index on
+    `search_vector` serves partial words too. On databases without
+    full-text search (SQLite in tests) the `search_fields` of the view
+    are matched with the default SearchFilter lookups.
+    """
+
+    def get_search_expression(self, request):
+        """Build a tsquery matching every search word as a prefix."""
+        terms = ' '.join(self.get_search_terms(request))
+        words = re.findall(r'[^\W_]+', terms)
+        return ' & '.join(f'{word}:*' for word in words)
+
+    def filter_queryset(self, request, queryset, view):
+        if not search_vector_supported(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        expression = self.get_search_expression(request)
+        if not expression:
+            return queryset
+
+        query = SearchQuery(
+            expression, search_type='raw', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', *queryset.query.order_by)
+
+
+class ProductFilter(BaseFilterBackend):
+    """Filter products by category, brand, attribute value, price and stock.
+
+    `category`, `brand` and `attribute_value` take comma separated ids,
+    a product matches when it has any of the given values.
+    """
+    id_params = ('category', 'brand', 'attribute_value')
+    price_params = ('price_min', 'price_max')
+    in_stock_param = 'in_stock'
+
+    def get_ids(self, request, param):
+        value = request.query_params.get(param)
+        if not value:
+            return []
+        try:
+            return [int(pk) for pk in value.split(',')]
+        except ValueError:
+            raise ValidationError(
+                {param: 'Enter a comma separated list of ids.'})
+
+    def get_price(self, request, param):
+        value = request.query_params.get(param)
+        if not value:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({param: 'Enter a whole number.'})
+
+    def get_in_stock(self, request):
+        value = request.query_params.get(self.in_stock_param)
+        if not value:
+            return None
+        if value.lower() in ('1', 'true'):
+            return True
+        if value.lower() in ('0', 'false'):
+            return False
+        raise ValidationError({self.in_stock_param: 'Enter true or false.'})
+
+    def get_facets_cache_key(self, request):
+        """Key of the cached facet snapshot, only for plain category pages.
+
+        Facets of a result set narrowed by anything other than a single
+        category are computed on every request. Snapshots are keyed on
+        the facets version, which product and reference data writes bump.
+        """
+        filter_params = set(self.id_params + self.price_params) | {
+            self.in_stock_param, 'search'}
+        used = {param for param in filter_params
+                if request.query_params.get(param)}
+        category = self.get_ids(request, 'category')
+        if used != {'category'} or len(category) != 1:
+            return None
+        return (f'product_facets:category:{category[0]}:'
+                f'{get_product_facets_version()}')
+
+    def filter_queryset(self, request, queryset, view):
+        category = self.get_ids(request, 'category')
+        if category:
+            queryset = queryset.filter(category_id__in=category)
+
+        brand = self.get_ids(request, 'brand')
+        if brand:
+            queryset = queryset.filter(brand_id__in=brand)
+
+        attribute_value = self.get_ids(request, 'attribute_value')
+        if attribute_value:
+            queryset = queryset.filter(
+                id__in=Product.attribute_value.through.objects.filter(
+                    attributevalue_id__in=attribute_value
+                ).values('product_id'))
+
+        price_min = self.get_price(request, 'price_min')
+        if price_min is not None:
+            queryset = queryset.filter(price_new__gte=price_min)
+
+        price_max = self.get_price(request, 'price_max')
+        if price_max is not None:
+            queryset = queryset.filter(price_new__lte=price_max)
+
+        in_stock = self.get_in_stock(request)
+        if in_stock is True:
+            queryset = queryset.filter(stock_qty__gt=0)
+        elif in_stock is False:
+            queryset = queryset.filter(stock_qty=0)
+
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        parameters = [{
+            'name': param, 'required': False, 'in': 'query',
+            'description': f'Comma separated {param} ids.',
+            'schema': {'type': 'string'},
+        } for param in self.id_params]
+        parameters += [{
+            'name': param, 'required': False, 'in': 'query',
+            'schema': {'type': 'integer'},
+        } for param in self.price_params]
+        parameters.append({
+            'name': self.in_stock_param, 'required': False, 'in': 'query',
+            'schema': {'type': 'boolean'},
+        })
+        return parameters
@@ -1,7 +1,17 @@
-from rest_framework.pagination import PageNumberPagination
+from MarketPlace.core.paginations import (
+    KeysetCursorPagination, KeysetPageNumberPagination,
+)
 
 
-class ProductAPIListPagination(PageNumberPagination):
+class ProductAPIListPagination(KeysetPageNumberPagination):
     page_size = 3
     page_size_query_param = 'page_size'
-    max_page_size = 10000
+    max_page_size = 100
+
+
+class ReviewCursorPagination(KeysetCursorPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+    tiebreak_ordering = ('-created_at', '-pk')
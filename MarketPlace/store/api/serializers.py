@@ -1,6 +1,5 @@
 from django.contrib.auth import get_user_model
 
-from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from store.models import (
@@ -56,7 +55,8 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         exclude = (
             'id', 'description', 'link_youtube', 'article',
-            'created_at', 'updated_at', 'attribute_value')
+            'created_at', 'updated_at', 'attribute_value', 'rating_sum',
+            'search_vector')
 
 
 class ProductDetailSerializer(serializers.ModelSerializer):
@@ -66,17 +66,12 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     owner = serializers.CharField(source='owner.username', read_only=True)
     attribute_value = AttributeValueSerializer(many=True, read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
-    review = serializers.SerializerMethodField(read_only=True)
+    review = ReviewRatingSerializer(
+        source='latest_reviews', many=True, read_only=True)
 
     class Meta:
         model = Product
-        exclude = ('id',)
-
-    @extend_schema_field(ReviewRatingSerializer)
-    def get_review(self, obj):
-        review = ReviewRating.objects.filter(
-            product=obj).order_by('-updated_at')
-        return ReviewRatingSerializer(review, many=True).data
+        exclude = ('id', 'rating_sum', 'search_vector')
 
 
 class ProductCreateSerializer(serializers.ModelSerializer):
@@ -94,8 +89,8 @@ class ProductCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         exclude = (
-            'id', 'is_available', 'rating', 'numReviews',
-            'price_old', 'article',
+            'id', 'is_available', 'rating', 'numReviews', 'rating_sum',
+            'price_old', 'article', 'search_vector',
         )
         extra_kwargs = {
             'owner': {'read_only': True, 'required': False},
@@ -1,8 +1,23 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save,
+)
 from django.dispatch import receiver
 
-from store.api.utils import unique_article_generator, unique_slug_generator
-from store.models import Product
+from store.api.utils import (
+    bump_product_facets_version, bump_reference_data_version,
+    invalidate_product_detail,
+    unique_article_generator, unique_slug_generator, update_search_vector,
+)
+from store.models import (
+    Attribute, AttributeValue, Brand, Category,
+    Product, ProductImage, ReviewRating,
+)
+
+SEARCH_VECTOR_FIELDS = {'product_name', 'category', 'brand'}
+
+
+def product_slugs(**filters):
+    return Product.objects.filter(**filters).values_list('slug', flat=True)
 
 
 @receiver(pre_save, sender=Product)
@@ -11,3 +26,68 @@ def pre_save_receiver(sender, instance, *args, **kwargs):
         instance.slug = unique_slug_generator(instance, instance.product_name)
     if not instance.article:
         instance.article = unique_article_generator(instance)
+
+
+@receiver(post_save, sender=Product)
+def post_save_search_vector_receiver(sender, instance, update_fields=None,
+                                     **kwargs):
+    if update_fields and not SEARCH_VECTOR_FIELDS.intersection(
+            update_fields):
+        return
+    update_search_vector(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def post_save_category_receiver(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vector(Product.objects.filter(category=instance))
+        invalidate_product_detail(product_slugs(category=instance))
+
+
+@receiver(post_save, sender=Brand)
+def post_save_brand_receiver(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vector(Product.objects.filter(brand=instance))
+        invalidate_product_detail(product_slugs(brand=instance))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_detail_cache_receiver(sender, instance, **kwargs):
+    invalidate_product_detail([instance.slug])
+    bump_product_facets_version()
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ReviewRating)
+@receiver(post_delete, sender=ReviewRating)
+def product_related_cache_receiver(sender, instance, **kwargs):
+    invalidate_product_detail(product_slugs(pk=instance.product_id))
+
+
+@receiver(m2m_changed, sender=Product.attribute_value.through)
+def product_attribute_value_cache_receiver(sender, instance, action, reverse,
+                                           pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_product_facets_version()
+    if reverse and action == 'pre_clear':
+        invalidate_product_detail(product_slugs(attribute_value=instance))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            invalidate_product_detail([instance.slug])
+        elif pk_set:
+            invalidate_product_detail(product_slugs(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=Attribute)
+@receiver(post_delete, sender=Attribute)
+@receiver(post_save, sender=AttributeValue)
+@receiver(post_delete, sender=AttributeValue)
+def reference_data_version_receiver(sender, **kwargs):
+    bump_reference_data_version()
+    bump_product_facets_version()
@@ -1,24 +1,238 @@
+import hashlib
+import json
 import random
 import string
+import time
 
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import (
+    Case, Count, DecimalField, F, FloatField,
+    IntegerField, OuterRef, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.lookups import GreaterThan
 from django.utils.text import slugify
 
+from store.models import (
+    AttributeValue, Brand, Category, Product, ReviewRating,
+)
 
-def update_product_review(product):
-    reviews = product.review.all()
-    count_reviews = reviews.count()
-    product.numReviews = count_reviews
+RATING_FIELD = DecimalField(max_digits=7, decimal_places=2)
+SEARCH_CONFIG = 'simple'
 
-    if count_reviews > 0:
-        total = 0
-        for rev in reviews:
-            total += rev.rating
 
-        product.rating = total / count_reviews
-    else:
-        product.rating = 0
+def rating_average(rating_sum, num_reviews):
+    """Expression for the average rating, 0 for products without reviews."""
+    return Case(
+        When(GreaterThan(num_reviews, 0),
+             then=Cast(rating_sum / num_reviews, RATING_FIELD)),
+        default=Value(0),
+        output_field=RATING_FIELD)
+
+
+def update_product_rating(product_id, rating_delta=0, count_delta=0):
+    """Apply a review change to the product rating aggregates.
+
+    Runs as a single UPDATE on the product row, so the cost does not
+    depend on the number of reviews and concurrent writes do not lose
+    increments.
+    """
+    rating_sum = F('rating_sum') + rating_delta
+    num_reviews = F('numReviews') + count_delta
+    Product.objects.filter(pk=product_id).update(
+        rating_sum=rating_sum, numReviews=num_reviews,
+        rating=rating_average(rating_sum, num_reviews))
+
+
+def recompute_product_ratings():
+    """Rebuild rating aggregates of all products from their reviews."""
+    reviews = ReviewRating.objects.filter(
+        product=OuterRef('pk')).order_by().values('product')
+    rating_sum = Coalesce(
+        Subquery(reviews.annotate(total=Sum('rating')).values('total')),
+        Value(0.0), output_field=FloatField())
+    num_reviews = Coalesce(
+        Subquery(reviews.annotate(total=Count('id')).values('total')),
+        Value(0), output_field=IntegerField())
+    updated = Product.objects.update(
+        rating_sum=rating_sum, numReviews=num_reviews,
+        rating=rating_average(rating_sum, num_reviews))
+    invalidate_product_detail(
+        Product.objects.values_list('slug', flat=True).iterator())
+    return updated
+
+
+def get_rating_histogram(product):
+    """Number of reviews of the product per rating, best first."""
+    return list(product.review.order_by('-rating').values(
+        'rating').annotate(count=Count('id')))
+
+
+def reserve_stock(quantities):
+    """Take ordered quantities off the stock of products.
+
+    `quantities` maps product ids to quantities. The products are locked
+    in id order, so concurrent checkouts can not deadlock, and all of
+    them are decremented with one conditional UPDATE, so stock never
+    goes negative. Returns ids of products without enough stock, then
+    no stock is taken.
+    """
+    products = Product.objects.select_for_update().filter(
+        pk__in=quantities).order_by('pk')
+    stock = dict(products.values_list('pk', 'stock_qty'))
+    out_of_stock = [pk for pk in sorted(quantities)
+                    if stock.get(pk, 0) < quantities[pk]]
+    if out_of_stock:
+        return out_of_stock
+
+    quantity = Case(
+        *[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()],
+        output_field=IntegerField())
+    updated = Product.objects.filter(
+        pk__in=quantities, stock_qty__gte=quantity).update(
+        stock_qty=F('stock_qty') - quantity)
+    if updated != len(quantities):
+        # Databases without row locks may have sold the stock meanwhile.
+        return sorted(quantities)
+    return []
+
+
+def product_detail_cache_key(slug):
+    return f'product_detail:{slug}'
+
+
+def absolute_image_urls(data, request):
+    """Copy of serialized product detail with absolute image URLs.
+
+    Matches what the image fields render when serialized with a request.
+    """
+    data = dict(data)
+    if data.get('image'):
+        data['image'] = request.build_absolute_uri(data['image'])
+    data['images'] = [
+        dict(image, image=request.build_absolute_uri(image['image']))
+        if image.get('image') else image
+        for image in data.get('images', ())]
+    return data
+
+
+def get_product_etag(data):
+    """Content hash of serialized product data."""
+    content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+def invalidate_product_detail(slugs):
+    """Drop cached detail responses of the products with given slugs.
+
+    The entries are dropped again once the current transaction commits,
+    as concurrent readers may cache the old rows until then.
+    """
+    keys = [product_detail_cache_key(slug) for slug in slugs]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+PRODUCT_FACETS_VERSION_KEY = 'product_facets:version'
+REFERENCE_DATA_VERSION_KEY = 'reference_data:version'
+_local_reference_data = {}
+
+
+def get_reference_data_version():
+    """Version of categories, brands and attributes, in nanoseconds.
+
+    The version never expires and only the write signals move it, so
+    ETags stay valid until the data changes. A version lost to eviction
+    is recreated from the clock, so clients never keep data older than
+    the latest write.
+    """
+    return cache.get_or_set(REFERENCE_DATA_VERSION_KEY, time.time_ns, None)
+
+
+def bump_reference_data_version():
+    cache.set(REFERENCE_DATA_VERSION_KEY, time.time_ns(), None)
+    transaction.on_commit(lambda: cache.set(
+        REFERENCE_DATA_VERSION_KEY, time.time_ns(), None))
+
+
+def get_reference_data(name, version, load):
+    """Reference data list `name` at `version`.
+
+    Looked up in process memory first, then in the shared cache, and
+    loaded with `load()` only when neither holds the current version.
+    """
+    local = _local_reference_data.get(name)
+    if local is not None and local[0] == version:
+        return local[1]
+
+    data = cache.get_or_set(
+        f'reference_data:{name}:{version}', load,
+        settings.REFERENCE_DATA_CACHE_TIMEOUT)
+    _local_reference_data[name] = (version, data)
+    return data
+
+
+def search_vector_supported(using='default'):
+    """Stored full-text search vectors are maintained on PostgreSQL only."""
+    return connections[using].vendor == 'postgresql'
+
+
+def product_search_vector():
+    """Weighted search document of product name, category and brand."""
+    category_name = Subquery(Category.objects.filter(
+        pk=OuterRef('category_id')).values('category_name')[:1])
+    brand_name = Subquery(Brand.objects.filter(
+        pk=OuterRef('brand_id')).values('brand_name')[:1])
+
+    return (
+        SearchVector('product_name', weight='A', config=SEARCH_CONFIG) +
+        SearchVector(
+            category_name, brand_name, weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(queryset):
+    """Refresh stored search vectors of the given products."""
+    if not search_vector_supported(queryset.db):
+        return 0
+    return queryset.update(search_vector=product_search_vector())
+
+
+def get_product_facets_version():
+    """Version of the cached facet snapshots, in nanoseconds."""
+    return cache.get_or_set(PRODUCT_FACETS_VERSION_KEY, time.time_ns, None)
+
+
+def bump_product_facets_version():
+    """Retire the cached facet snapshots, again once the transaction
+    commits, as concurrent readers may cache the old rows until then.
+    """
+    cache.set(PRODUCT_FACETS_VERSION_KEY, time.time_ns(), None)
+    transaction.on_commit(lambda: cache.set(
+        PRODUCT_FACETS_VERSION_KEY, time.time_ns(), None))
+
+
+def get_product_facets(queryset):
+    """Facet counts of the given products, one aggregate query per facet."""
+    products = queryset.values('pk')
 
-    product.save()
+    return {
+        'category': list(Category.objects.filter(
+            product__in=products).annotate(count=Count('product')).values(
+            'id', 'category_name', 'count').order_by('category_name')),
+        'brand': list(Brand.objects.filter(
+            product__in=products).annotate(count=Count('product')).values(
+            'id', 'brand_name', 'count').order_by('brand_name')),
+        'attribute_value': list(AttributeValue.objects.filter(
+            product__in=products).annotate(count=Count('product')).values(
+            'id', 'value', 'attribute__name', 'count').order_by(
+            'attribute__name', 'value')),
+    }
 
 
 def random_string_generator(size=10,
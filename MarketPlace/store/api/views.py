@@ -1,3 +1,9 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
 from drf_spectacular import openapi
 from drf_spectacular.utils import extend_schema
 
@@ -5,10 +11,10 @@ from rest_framework import (
     generics, viewsets, status, mixins
 )
 from rest_framework.permissions import (
-    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
 )
 from rest_framework.response import Response
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 
 from store.api.serializers import (
     ProductSerializer, ProductDetailSerializer,
@@ -16,16 +22,25 @@ from store.api.serializers import (
     CategorySerializer, BrandSerializer,
     AttributeValueSerializer,
 )
-from store.api.utils import update_product_review
+from store.api.utils import (
+    absolute_image_urls, get_product_etag, get_product_facets,
+    get_rating_histogram, get_reference_data, get_reference_data_version,
+    product_detail_cache_key, update_product_rating,
+)
 from store.models import (
     Product, ReviewRating, Category,
     Brand, AttributeValue
 )
+from MarketPlace.core.authentication import AuthenticationProfileMixin
 from MarketPlace.core.permissions import IsAdminOrReadOnly
-from store.api.paginations import ProductAPIListPagination
+from store.api.filters import ProductFilter, ProductSearchFilter
+from store.api.paginations import (
+    ProductAPIListPagination, ReviewCursorPagination,
+)
 
 
-class ProductAPIView(viewsets.GenericViewSet,
+class ProductAPIView(AuthenticationProfileMixin,
+                     viewsets.GenericViewSet,
                      mixins.ListModelMixin,
                      mixins.UpdateModelMixin,
                      mixins.DestroyModelMixin):
@@ -35,14 +50,16 @@ class ProductAPIView(viewsets.GenericViewSet,
         'category', 'brand', 'owner', 'owner__user_profile'
     )
     lookup_field = 'slug'
+    authentication_profile = 'public'
     permission_classes = [IsAdminOrReadOnly]
     pagination_class = ProductAPIListPagination
-    filter_backends = (SearchFilter, OrderingFilter)
+    filter_backends = (ProductFilter, ProductSearchFilter, OrderingFilter)
     search_fields = ('product_name', 'category__category_name',
                      'brand__brand_name',)
     ordering_fields = ('product_name', 'category', 'brand',
                        'attribute_value', 'price_new',
                        'stock_qty', 'created_at',)
+    detail_reviews_count = 10
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -53,19 +70,81 @@ class ProductAPIView(viewsets.GenericViewSet,
             return ProductCreateSerializer
         return ProductSerializer
 
-    def retrieve(self, request, slug=None):
-        """Detail product."""
-        try:
-            serializer = self.get_serializer(
-                self.queryset.get(slug=slug), many=False)
-
-            data = Response(serializer.data)
+    def get_facets(self, queryset):
+        """Facet counts of the filtered products.
+
+        Plain category pages are served from a cached snapshot.
+        """
+        cache_key = ProductFilter().get_facets_cache_key(self.request)
+        if cache_key is None:
+            return get_product_facets(queryset)
+
+        facets = cache.get(cache_key)
+        if facets is None:
+            facets = get_product_facets(queryset)
+            cache.set(cache_key, facets, settings.PRODUCT_FACETS_CACHE_TIMEOUT)
+        return facets
+
+    @extend_schema(parameters=[openapi.OpenApiParameter(
+        'facets', openapi.OpenApiTypes.BOOL,
+        description='Add facet counts of the filtered products.')])
+    def list(self, request, *args, **kwargs):
+        """List products."""
+        response = super().list(request, *args, **kwargs)
+
+        if request.query_params.get('facets', '').lower() in ('1', 'true'):
+            response.data['facets'] = self.get_facets(
+                self.filter_queryset(self.get_queryset()))
+        return response
+
+    def get_detail_queryset(self):
+        """Products with everything the detail serializer renders."""
+        reviews = ReviewRating.objects.select_related(
+            'user__user_profile').order_by('-updated_at', '-id')
+
+        return self.get_queryset().prefetch_related(
+            'images',
+            Prefetch('attribute_value',
+                     queryset=AttributeValue.objects.select_related(
+                         'attribute')),
+            Prefetch('review',
+                     queryset=reviews[:self.detail_reviews_count],
+                     to_attr='latest_reviews'),
+        )
 
-            return data
-        except Product.DoesNotExist:
+    def retrieve(self, request, slug=None):
+        """Detail product.
+
+        Serialized products are cached per slug and answered with 304
+        when `If-None-Match` carries the current ETag.
+        """
+        cache_key = product_detail_cache_key(slug)
+        cached = cache.get(cache_key)
+
+        if cached is None:
+            try:
+                # Serialized without the request, the cached data must not
+                # depend on the host of the request which filled the cache
+                serializer = self.get_serializer_class()(
+                    self.get_detail_queryset().get(slug=slug), many=False)
+            except Product.DoesNotExist:
+                return Response(
+                    {'error': 'Product with this slug does not exist.'},
+                    status=status.HTTP_404_NOT_FOUND)
+
+            cached = (get_product_etag(serializer.data), serializer.data)
+            cache.set(
+                cache_key, cached, settings.PRODUCT_DETAIL_CACHE_TIMEOUT)
+
+        etag, data = cached
+        etag = quote_etag(etag)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and etag in parse_etags(if_none_match):
             return Response(
-                {'error': 'Product with this slug does not exist.'},
-                status=status.HTTP_404_NOT_FOUND)
+                status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        return Response(absolute_image_urls(data, request),
+                        headers={'ETag': etag})
 
     def create(self, request):
         """Create product."""
@@ -80,22 +159,56 @@ class ProductAPIView(viewsets.GenericViewSet,
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class CategoryAPIView(generics.ListAPIView):
+class ReferenceDataListAPIView(AuthenticationProfileMixin,
+                               generics.ListAPIView):
+    """List rarely changing reference data from a versioned cache.
+
+    Responses carry ETag, Last-Modified and Cache-Control headers, so
+    clients and CDNs can reuse them until the next write.
+    """
+    reference_data_name = None
+    authentication_profile = 'public'
+
+    def list(self, request, *args, **kwargs):
+        version = get_reference_data_version()
+        headers = {
+            'ETag': quote_etag(f'{self.reference_data_name}-{version}'),
+            'Last-Modified': http_date(version // 10 ** 9),
+            'Cache-Control':
+                f'public, max-age={settings.REFERENCE_DATA_MAX_AGE}',
+        }
+
+        not_modified = get_conditional_response(
+            request, etag=headers['ETag'], last_modified=version // 10 ** 9)
+        if not_modified is not None:
+            return Response(status=not_modified.status_code, headers=headers)
+
+        data = get_reference_data(
+            self.reference_data_name, version,
+            lambda: self.get_serializer(
+                self.filter_queryset(self.get_queryset()), many=True).data)
+        return Response(data, headers=headers)
+
+
+class CategoryAPIView(ReferenceDataListAPIView):
     """List Category."""
+    reference_data_name = 'category'
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class BrandAPIView(generics.ListAPIView):
+class BrandAPIView(ReferenceDataListAPIView):
     """List Brand."""
+    reference_data_name = 'brand'
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class AttributeValueAPIView(generics.ListAPIView):
+class AttributeValueAPIView(ReferenceDataListAPIView):
     """List AttributeValue."""
+    reference_data_name = 'attribute_value'
     queryset = AttributeValue.objects.all().select_related('attribute')
     serializer_class = AttributeValueSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -105,9 +218,34 @@ class AttributeValueAPIView(generics.ListAPIView):
     parameters=[openapi.OpenApiParameter(
         'slug', openapi.OpenApiTypes.STR, openapi.OpenApiParameter.PATH)],
     tags=['review'])
-class ProductReviewAPIView(generics.GenericAPIView):
+class ProductReviewAPIView(AuthenticationProfileMixin,
+                           generics.GenericAPIView):
     serializer_class = ReviewRatingSerializer
-    permission_classes = [IsAuthenticated]
+    authentication_profile = 'public'
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ReviewCursorPagination
+    filter_backends = (OrderingFilter,)
+    ordering_fields = ('created_at', 'rating',)
+    ordering = ('-created_at',)
+
+    @extend_schema(responses=ReviewRatingSerializer(many=True))
+    def get(self, request, slug=None):
+        """List reviews of Product with a rating histogram."""
+        try:
+            product = Product.objects.only('id').get(slug=slug)
+        except Product.DoesNotExist:
+            return Response(
+                {'error': 'Product does not exists.'},
+                status=status.HTTP_404_NOT_FOUND)
+
+        queryset = self.filter_queryset(
+            product.review.select_related('user__user_profile'))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+
+        response = self.get_paginated_response(serializer.data)
+        response.data['histogram'] = get_rating_histogram(product)
+        return response
 
     def post(self, request, slug=None):
         """Create review for Product."""
@@ -133,15 +271,16 @@ class ProductReviewAPIView(generics.GenericAPIView):
             return Response({'detail': 'Product already reviewed.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        ReviewRating.objects.create(
-            user=user,
-            product=product,
-            name=user.get_full_name(),
-            rating=data['rating'],
-            comment=data['comment'],
-        )
-
-        update_product_review(product)
+        with transaction.atomic():
+            review = ReviewRating.objects.create(
+                user=user,
+                product=product,
+                name=user.get_full_name(),
+                rating=data['rating'],
+                comment=data['comment'],
+            )
+            update_product_rating(
+                product.id, rating_delta=review.rating, count_delta=1)
 
         return Response('Review Added.', status=status.HTTP_201_CREATED)
 
@@ -158,17 +297,22 @@ class ProductReviewAPIView(generics.GenericAPIView):
         serializer = self.serializer_class(data=data)
         serializer.is_valid(raise_exception=True)
 
-        try:
-            review = ReviewRating.objects.get(user=user, product=product)
-            review.rating = data['rating']
-            review.comment = data['comment']
+        with transaction.atomic():
+            try:
+                review = ReviewRating.objects.select_for_update().get(
+                    user=user, product=product)
+            except ReviewRating.DoesNotExist:
+                return Response({'message': 'Review does not exists.'},
+                                status=status.HTTP_404_NOT_FOUND)
+
+            old_rating = review.rating
+            review.rating = serializer.validated_data['rating']
+            review.comment = serializer.validated_data.get(
+                'comment', review.comment)
             review.save()
 
-        except ReviewRating.DoesNotExist:
-            return Response({'message': 'Review does not exists.'},
-                            status=status.HTTP_404_NOT_FOUND)
-
-        update_product_review(product)
+            update_product_rating(
+                product.id, rating_delta=review.rating - old_rating)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -183,12 +327,15 @@ class ProductReviewAPIView(generics.GenericAPIView):
                 {'error': 'Product does not exists.'},
                 status=status.HTTP_404_NOT_FOUND)
 
-        try:
-            review = ReviewRating.objects.get(user=user, product=product)
-            review.delete()
-        except ReviewRating.DoesNotExist:
-            return Response({'message': 'Review does not exists.'})
+        with transaction.atomic():
+            try:
+                review = ReviewRating.objects.select_for_update().get(
+                    user=user, product=product)
+            except ReviewRating.DoesNotExist:
+                return Response({'message': 'Review does not exists.'})
 
-        update_product_review(product)
+            review.delete()
+            update_product_rating(
+                product.id, rating_delta=-review.rating, count_delta=-1)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from store.api.utils import recompute_product_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute rating aggregates of all products from their reviews.'
+
+    def handle(self, *args, **options):
+        updated = recompute_product_ratings()
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed ratings for {updated} products.'))
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.4 on 2026-10-18 07:41
+
+from django.db import migrations, models
+
+
+def fill_rating_sum(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    ReviewRating = apps.get_model('store', 'ReviewRating')
+
+    totals = ReviewRating.objects.order_by().values('product').annotate(
+        total=models.Sum('rating'), count=models.Count('id'))
+    products = []
+    for row in totals:
+        products.append(Product(
+            id=row['product'], rating_sum=row['total'],
+            numReviews=row['count']))
+    Product.objects.bulk_update(
+        products, ['rating_sum', 'numReviews'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(fill_rating_sum, migrations.RunPython.noop),
+    ]
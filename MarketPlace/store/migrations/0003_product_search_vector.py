@@ -0,0 +1,43 @@
+# Generated by Django 4.2.4 on 2026-10-18 07:42
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+def fill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('store', 'Product')
+    Category = apps.get_model('store', 'Category')
+    Brand = apps.get_model('store', 'Brand')
+
+    category_name = models.Subquery(Category.objects.filter(
+        pk=models.OuterRef('category_id')).values('category_name')[:1])
+    brand_name = models.Subquery(Brand.objects.filter(
+        pk=models.OuterRef('brand_id')).values('brand_name')[:1])
+    Product.objects.update(search_vector=(
+        SearchVector('product_name', weight='A', config='simple') +
+        SearchVector(category_name, brand_name, weight='B', config='simple')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_product_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
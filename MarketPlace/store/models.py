@@ -1,5 +1,7 @@
 import os
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 
@@ -48,11 +50,13 @@ class Product(models.Model):
     price_new = models.PositiveIntegerField()
     price_old = models.PositiveIntegerField(blank=True, default=0)
     stock_qty = models.PositiveIntegerField()
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
 
     # Rating
     rating = models.DecimalField(
         max_digits=7, decimal_places=2, null=True, blank=True)
     numReviews = models.PositiveIntegerField(default=0, null=True, blank=True)
+    rating_sum = models.FloatField(default=0)
 
     # additional fields
     is_available = models.BooleanField(default=True)
@@ -61,6 +65,14 @@ class Product(models.Model):
 
     objects = ManagerQuerySet.as_manager()
 
+    class Meta:
+        indexes = (
+            GinIndex(fields=('search_vector',),
+                     name='product_search_vector_idx'),
+            models.Index(fields=('-created_at', '-id'),
+                         name='product_created_at_id_idx'),
+        )
+
     def __str__(self):
         return self.product_name
 
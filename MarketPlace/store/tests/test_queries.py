@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from accounts.tests.test_views import create_user, fake
+from store.models import (
+    Attribute, AttributeValue, Brand,
+    Category, ProductImage, ReviewRating,
+)
+from store.tests.test_views import create_product, detail_product_url
+
+# product, attribute values, images and reviews
+PRODUCT_DETAIL_QUERIES = 4
+
+
+class ProductDetailQueryTests(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.owner = create_user(
+            username=fake.email().split('@')[0], email=fake.email())
+        self.attribute = Attribute.objects.create(name='color')
+        self.attribute_value = AttributeValue.objects.create(
+            value='red', attribute=self.attribute)
+        self.product = create_product(
+            owner=self.owner,
+            category=Category.objects.create(category_name='phones'),
+            brand=Brand.objects.create(brand_name='apple'),
+            attribute_value=self.attribute_value)
+
+    def add_related(self, count):
+        start = ReviewRating.objects.count()
+        for i in range(start, start + count):
+            user = create_user(
+                username=fake.email().split('@')[0], email=fake.email())
+            ReviewRating.objects.create(
+                user=user, product=self.product, rating=4, name=f'user {i}')
+            ProductImage.objects.create(product=self.product)
+            self.product.attribute_value.add(AttributeValue.objects.create(
+                value=f'value {i}', attribute=self.attribute))
+
+    def assert_detail_queries(self):
+        with self.assertNumQueries(PRODUCT_DETAIL_QUERIES):
+            res = self.client.get(detail_product_url(self.product.slug))
+        return res
+
+    def test_detail_queries_without_reviews(self):
+        res = self.assert_detail_queries()
+
+        self.assertEqual(res.data['review'], [])
+
+    def test_detail_queries_do_not_grow_with_related_rows(self):
+        self.add_related(1)
+        self.assert_detail_queries()
+
+        self.add_related(15)
+        res = self.assert_detail_queries()
+
+        self.assertEqual(len(res.data['images']), 16)
+        self.assertEqual(len(res.data['attribute_value']), 17)
+        self.assertEqual(len(res.data['review']), 10)
+
+    def test_detail_reviews_latest_first(self):
+        self.add_related(3)
+        review = ReviewRating.objects.order_by('id').first()
+        review.comment = 'updated'
+        review.save()
+
+        res = self.client.get(detail_product_url(self.product.slug))
+
+        self.assertEqual(res.data['review'][0]['comment'], 'updated')
+        self.assertIn('profile_image', res.data['review'][0])
+
+    def test_detail_cached_without_queries(self):
+        self.add_related(3)
+        self.assert_detail_queries()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(detail_product_url(self.product.slug))
+        self.assertEqual(len(res.data['review']), 3)
@@ -1,13 +1,26 @@
-from django.test import TestCase
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 
 from accounts.tests.test_views import create_user, create_superuser, fake
 from ..models import (
-    Product, AttributeValue,
+    Product, AttributeValue, ProductImage,
     Category, Brand, Attribute, ReviewRating,
 )
-from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from store.api.filters import ProductSearchFilter
+from store.api.utils import update_product_rating
+from store.api.views import ProductAPIView
 
 PRODUCT_URL = reverse('store:product-list')
 
@@ -35,6 +48,15 @@ def create_product(
     return product
 
 
+def create_review(user, product, rating):
+    """Create a review and apply it to the product rating aggregates."""
+    review = ReviewRating.objects.create(
+        user=user, product=product, rating=rating)
+    update_product_rating(product.id, rating_delta=rating, count_delta=1)
+
+    return review
+
+
 class PublicStoreApiTests(TestCase):
 
     def test_create_product_unauthorized(self):
@@ -47,6 +69,479 @@ class PublicStoreApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_catalog_reads_skip_authentication(self):
+        for url in (PRODUCT_URL, reverse('store:list_category')):
+            res = self.client.get(url, HTTP_AUTHORIZATION='Bearer invalid')
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_create_product_invalid_token(self):
+        res = self.client.post(
+            PRODUCT_URL, {}, HTTP_AUTHORIZATION='Bearer invalid')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_product_search(self):
+        owner = create_user()
+        attribute_value = AttributeValue.objects.create(
+            value='red', attribute=Attribute.objects.create(name='color'))
+        phone = create_product(
+            owner=owner, attribute_value=attribute_value,
+            category=Category.objects.create(category_name='phones'),
+            brand=Brand.objects.create(brand_name='apple'),
+            product_name='iphone')
+        create_product(
+            owner=owner, attribute_value=attribute_value,
+            category=Category.objects.create(category_name='laptops'),
+            brand=Brand.objects.create(brand_name='lenovo'),
+            product_name='thinkpad')
+
+        res = self.client.get(PRODUCT_URL, {'search': 'apple'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['results'][0]['slug'], phone.slug)
+
+    def test_product_search_query_prefix_terms(self):
+        request = APIRequestFactory().get(
+            PRODUCT_URL, {'search': 'iph, 13_pro!'})
+        expression = ProductSearchFilter().get_search_expression(
+            Request(request))
+
+        self.assertEqual(expression, 'iph:* & 13:* & pro:*')
+
+
+class ProductFilterApiTests(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        owner = create_user()
+        color = Attribute.objects.create(name='color')
+        self.red = AttributeValue.objects.create(value='red', attribute=color)
+        self.blue = AttributeValue.objects.create(
+            value='blue', attribute=color)
+        self.phones = Category.objects.create(category_name='phones')
+        self.laptops = Category.objects.create(category_name='laptops')
+        self.apple = Brand.objects.create(brand_name='apple')
+        self.lenovo = Brand.objects.create(brand_name='lenovo')
+        self.iphone = create_product(
+            owner=owner, category=self.phones, brand=self.apple,
+            attribute_value=self.red, product_name='iphone', price_new=900)
+        self.moto = create_product(
+            owner=owner, category=self.phones, brand=self.lenovo,
+            attribute_value=self.blue, product_name='moto', price_new=300,
+            stock_qty=0)
+        self.thinkpad = create_product(
+            owner=owner, category=self.laptops, brand=self.lenovo,
+            attribute_value=self.blue, product_name='thinkpad',
+            price_new=1500)
+
+    def get_slugs(self, params):
+        res = self.client.get(PRODUCT_URL, {'page_size': 10, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {product['slug'] for product in res.data['results']}
+
+    def test_filter_by_category_and_brand(self):
+        self.assertEqual(
+            self.get_slugs({'category': self.phones.id}),
+            {self.iphone.slug, self.moto.slug})
+        self.assertEqual(
+            self.get_slugs({'brand': f'{self.apple.id},{self.lenovo.id}',
+                            'category': self.laptops.id}),
+            {self.thinkpad.slug})
+
+    def test_filter_by_attribute_value(self):
+        self.assertEqual(
+            self.get_slugs({'attribute_value': self.blue.id}),
+            {self.moto.slug, self.thinkpad.slug})
+
+    def test_filter_by_price_and_stock(self):
+        self.assertEqual(
+            self.get_slugs({'price_min': 300, 'price_max': 1000}),
+            {self.iphone.slug, self.moto.slug})
+        self.assertEqual(
+            self.get_slugs({'price_max': 1000, 'in_stock': 'true'}),
+            {self.iphone.slug})
+
+    def test_filter_invalid_value(self):
+        res = self.client.get(PRODUCT_URL, {'brand': 'apple'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_facets(self):
+        res = self.client.get(
+            PRODUCT_URL, {'facets': 'true', 'brand': self.lenovo.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        facets = res.data['facets']
+        self.assertEqual(
+            [(row['category_name'], row['count'])
+             for row in facets['category']],
+            [('laptops', 1), ('phones', 1)])
+        self.assertEqual(
+            [(row['brand_name'], row['count']) for row in facets['brand']],
+            [('lenovo', 2)])
+        self.assertEqual(
+            [(row['value'], row['count'])
+             for row in facets['attribute_value']],
+            [('blue', 2)])
+
+    def test_list_without_facets(self):
+        res = self.client.get(PRODUCT_URL)
+
+        self.assertNotIn('facets', res.data)
+
+    def test_category_facets_snapshot_cached(self):
+        params = {'facets': 'true', 'category': self.phones.id}
+        res = self.client.get(PRODUCT_URL, params)
+        self.assertEqual(len(res.data['facets']['brand']), 2)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(PRODUCT_URL, params)
+        self.assertEqual(len(res.data['facets']['brand']), 2)
+
+    def test_category_facets_snapshot_after_write(self):
+        params = {'facets': 'true', 'category': self.phones.id}
+        res = self.client.get(PRODUCT_URL, params)
+        self.assertEqual(len(res.data['facets']['brand']), 2)
+
+        nokia = Brand.objects.create(brand_name='nokia')
+        create_product(
+            owner=self.iphone.owner, category=self.phones, brand=nokia,
+            attribute_value=self.red, product_name='nokia')
+        res = self.client.get(PRODUCT_URL, params)
+
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(len(res.data['facets']['brand']), 3)
+
+        nokia.brand_name = 'hmd'
+        nokia.save()
+        res = self.client.get(PRODUCT_URL, params)
+
+        self.assertIn('hmd', [row['brand_name']
+                              for row in res.data['facets']['brand']])
+
+
+class ProductPaginationApiTests(TestCase):
+
+    def setUp(self) -> None:
+        owner = create_user()
+        attribute_value = AttributeValue.objects.create(
+            value='red', attribute=Attribute.objects.create(name='color'))
+        category = Category.objects.create(category_name='phones')
+        brand = Brand.objects.create(brand_name='apple')
+        self.products = [create_product(
+            owner=owner, category=category, brand=brand,
+            attribute_value=attribute_value, product_name=f'phone {i}')
+            for i in range(5)]
+        # Same created_at for all products, ties are broken by id.
+        Product.objects.update(created_at=self.products[0].created_at)
+
+    def test_list_products_cursor_pagination(self):
+        slugs = []
+        res = self.client.get(
+            PRODUCT_URL, {'pagination': 'cursor', 'page_size': 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', res.data)
+            slugs += [product['slug'] for product in res.data['results']]
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            slugs, [product.slug for product in reversed(self.products)])
+
+    def test_list_products_cursor_pagination_ordering(self):
+        for price, product in zip((3, 1, 2, 1, 3), self.products):
+            product.price_new = price
+            product.save()
+
+        pages = []
+        res = self.client.get(PRODUCT_URL, {
+            'pagination': 'cursor', 'page_size': 2, 'ordering': 'price_new'})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages += [(product['price_new'], product['slug'])
+                      for product in res.data['results']]
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+
+        products = sorted(self.products, key=lambda p: (p.price_new, -p.pk))
+        self.assertEqual([slug for _, slug in pages],
+                         [product.slug for product in products])
+
+    def test_list_products_cursor_pagination_invalid_ordering(self):
+        res = self.client.get(PRODUCT_URL, {
+            'pagination': 'cursor', 'ordering': 'attribute_value'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pagination', res.data)
+
+    def test_list_products_invalid_cursor(self):
+        res = self.client.get(PRODUCT_URL, {'cursor': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_products_without_count(self):
+        res = self.client.get(
+            PRODUCT_URL, {'count': 'false', 'page': 2, 'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', res.data)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIn('page=3', res.data['next'])
+        self.assertNotIn('page=', res.data['previous'])
+
+    def test_list_products_page_size_cap(self):
+        request = Request(
+            APIRequestFactory().get(PRODUCT_URL, {'page_size': 10000}))
+        paginator = ProductAPIView.pagination_class()
+
+        self.assertEqual(paginator.get_page_size(request), 100)
+
+
+class ProductReviewListApiTests(TestCase):
+
+    def setUp(self) -> None:
+        owner = create_user()
+        self.product = create_product(
+            owner=owner,
+            category=Category.objects.create(category_name='phones'),
+            brand=Brand.objects.create(brand_name='apple'),
+            attribute_value=AttributeValue.objects.create(
+                value='red',
+                attribute=Attribute.objects.create(name='color')))
+        for rating in (5, 3, 5, 1):
+            create_review(
+                user=create_user(username=fake.email().split('@')[0],
+                                 email=fake.email()),
+                product=self.product, rating=rating)
+
+    def test_list_reviews_paginated(self):
+        url = detail_review_url(self.product.slug)
+        ratings = []
+        res = self.client.get(url, {'page_size': 3})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ratings += [review['rating'] for review in res.data['results']]
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(ratings, [1, 5, 3, 5])
+
+    def test_list_reviews_ordering_by_rating(self):
+        res = self.client.get(
+            detail_review_url(self.product.slug), {'ordering': '-rating'})
+
+        self.assertEqual(
+            [review['rating'] for review in res.data['results']],
+            [5, 5, 3, 1])
+
+    def test_list_reviews_ordering_by_rating_paginated(self):
+        for _ in range(6):
+            create_review(
+                user=create_user(username=fake.email().split('@')[0],
+                                 email=fake.email()),
+                product=self.product, rating=5)
+        url = detail_review_url(self.product.slug)
+        pages = []
+        res = self.client.get(url, {'ordering': '-rating', 'page_size': 3})
+        while True:
+            pages.append([review['user'] for review in res.data['results']])
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+
+        users = [user for page in pages for user in page]
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(len(users), 10)
+        self.assertEqual(len(set(users)), 10)
+
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(
+            [review['user'] for review in res.data['results']], pages[-2])
+
+    def test_list_reviews_invalid_cursor(self):
+        res = self.client.get(
+            detail_review_url(self.product.slug), {'cursor': 'bad'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_reviews_histogram(self):
+        res = self.client.get(detail_review_url(self.product.slug))
+
+        self.assertEqual(
+            [(row['rating'], row['count'])
+             for row in res.data['histogram']],
+            [(5, 2), (3, 1), (1, 1)])
+
+    def test_list_reviews_product_not_found(self):
+        res = self.client.get(detail_review_url('missing'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_review_unauthorized(self):
+        res = self.client.post(
+            detail_review_url(self.product.slug), {'rating': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ProductDetailCacheApiTests(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user()
+        self.attribute = Attribute.objects.create(name='color')
+        self.attribute_value = AttributeValue.objects.create(
+            value='red', attribute=self.attribute)
+        self.product = create_product(
+            owner=self.user,
+            category=Category.objects.create(category_name='phones'),
+            brand=Brand.objects.create(brand_name='apple'),
+            attribute_value=self.attribute_value)
+        self.url = detail_product_url(self.product.slug)
+
+    def test_detail_etag_not_modified(self):
+        res = self.client.get(self.url)
+        etag = res['ETag']
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(ALLOWED_HOSTS=['.example.com'])
+    def test_detail_image_urls_use_request_host(self):
+        self.client.get(self.url, HTTP_HOST='first.example.com')
+
+        res = self.client.get(self.url, HTTP_HOST='second.example.com')
+
+        self.assertTrue(
+            res.data['image'].startswith('http://second.example.com/'))
+
+    def test_detail_invalidated_on_recompute_ratings(self):
+        ReviewRating.objects.create(
+            user=self.user, product=self.product, rating=4)
+        self.client.get(self.url)
+
+        call_command('recompute_product_ratings', stdout=StringIO())
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data['numReviews'], 1)
+
+    def test_detail_invalidated_on_product_change(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.product.price_new = 10
+        self.product.save()
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['price_new'], 10)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_invalidated_on_review(self):
+        self.client.get(self.url)
+
+        create_review(user=create_user(
+            username='reviewer', email='reviewer@test.com'),
+            product=self.product, rating=4)
+        res = self.client.get(self.url)
+
+        self.assertEqual(len(res.data['review']), 1)
+        self.assertEqual(res.data['numReviews'], 1)
+
+    def test_detail_invalidated_on_image(self):
+        self.client.get(self.url)
+
+        image = ProductImage.objects.create(product=self.product)
+        self.assertEqual(len(self.client.get(self.url).data['images']), 1)
+
+        image.delete()
+        self.assertEqual(len(self.client.get(self.url).data['images']), 0)
+
+    def test_detail_invalidated_on_attribute_values(self):
+        self.client.get(self.url)
+
+        blue = AttributeValue.objects.create(
+            value='blue', attribute=self.attribute)
+        self.product.attribute_value.add(blue)
+        self.assertEqual(
+            len(self.client.get(self.url).data['attribute_value']), 2)
+
+        blue.product_set.clear()
+        self.assertEqual(
+            len(self.client.get(self.url).data['attribute_value']), 1)
+
+
+class ReferenceDataApiTests(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        Brand.objects.create(brand_name='apple')
+        self.url = reverse('store:list_brand')
+
+    def test_list_reference_data_headers(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+        self.assertIn('public', res['Cache-Control'])
+
+    def test_list_reference_data_cached(self):
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(self.url)
+        self.assertEqual(len(res.data), 1)
+
+    def test_list_reference_data_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_list_reference_data_new_version_on_write(self):
+        etag = self.client.get(self.url)['ETag']
+
+        Brand.objects.create(brand_name='lenovo')
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_reference_data_version_without_writes(self):
+        etag = self.client.get(self.url)['ETag']
+
+        later = time.time() + settings.REFERENCE_DATA_CACHE_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time',
+                        return_value=later):
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_list_attribute_values_after_write(self):
+        self.client.get(reverse('store:list_attribute_value'))
+
+        AttributeValue.objects.create(
+            value='red', attribute=Attribute.objects.create(name='color'))
+        res = self.client.get(reverse('store:list_attribute_value'))
+
+        self.assertEqual(len(res.data), 1)
+
 
 class PrivateStoreApiTests(TestCase):
 
@@ -158,10 +653,7 @@ class PrivateStoreApiTests(TestCase):
         self.assertEqual(self.product.numReviews, 1)
 
     def test_update_review_for_product(self):
-        ReviewRating.objects.create(
-            user=self.user_cus, product=self.product,
-            rating=1,
-        )
+        create_review(user=self.user_cus, product=self.product, rating=1)
         payload = {
             'rating': 5,
             'comment': '',
@@ -180,10 +672,7 @@ class PrivateStoreApiTests(TestCase):
         self.assertEqual(self.product.numReviews, 1)
 
     def test_delete_review_for_product(self):
-        ReviewRating.objects.create(
-            user=self.user_cus, product=self.product,
-            rating=1,
-        )
+        create_review(user=self.user_cus, product=self.product, rating=1)
         url = detail_review_url(self.product.slug)
         self.client.force_authenticate(self.user_cus)
         res = self.client.delete(url, format='json')
@@ -196,3 +685,48 @@ class PrivateStoreApiTests(TestCase):
         self.product.refresh_from_db()
         self.assertEqual(self.product.rating, 0)
         self.assertEqual(self.product.numReviews, 0)
+
+    def test_review_rating_aggregates(self):
+        user = create_user(
+            username=fake.email().split('@')[0], email=fake.email())
+        create_review(user=user, product=self.product, rating=4)
+        url = detail_review_url(self.product.slug)
+        self.client.force_authenticate(self.user_cus)
+
+        self.client.post(url, {'rating': 2, 'comment': ''}, format='json')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.numReviews, 2)
+        self.assertEqual(self.product.rating_sum, 6)
+        self.assertEqual(self.product.rating, 3)
+
+        self.client.patch(url, {'rating': 5}, format='json')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.numReviews, 2)
+        self.assertEqual(self.product.rating, Decimal('4.5'))
+
+        self.client.delete(url)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.numReviews, 1)
+        self.assertEqual(self.product.rating, 4)
+
+    def test_recompute_product_ratings_command(self):
+        ReviewRating.objects.create(
+            user=self.user_cus, product=self.product, rating=2)
+        ReviewRating.objects.create(
+            user=self.user_admin, product=self.product, rating=3)
+        product = create_product(
+            owner=self.user_admin, category=self.category,
+            brand=self.brand, attribute_value=self.attribute_value,
+            product_name='no_reviews')
+        Product.objects.filter(id=product.id).update(
+            rating=5, rating_sum=5, numReviews=1)
+
+        call_command('recompute_product_ratings', stdout=StringIO())
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.numReviews, 2)
+        self.assertEqual(self.product.rating_sum, 5)
+        self.assertEqual(self.product.rating, Decimal('2.5'))
+        product.refresh_from_db()
+        self.assertEqual(product.numReviews, 0)
+        self.assertEqual(product.rating, 0)